@@ -1,7 +1,8 @@
 from typing import Any, Dict, List, Tuple
-from react import useCallback, useContext
+from react import useCallback, useContext, useEffect, useRef
 from react_i18next import useTranslation
 from utils.app.const import DEFAULT_SYSTEM_PROMPT
+from utils.app.conversation import get_conversation_hash
 from utils.trpc import trpc
 from pages.api.home.home_context import HomeContext
 from uuid import uuid4
@@ -23,26 +24,66 @@ def useConversations() -> Tuple[List[Conversation], ConversationsAction]:
     tErr = useTranslation('error')['t']
     conversationUpdateAll = trpc.conversations.updateAll.useMutation()
     conversationUpdate = trpc.conversations.update.useMutation()
+    conversationAppendMessage = trpc.conversations.appendMessage.useMutation()
     conversationRemove = trpc.conversations.remove.useMutation()
     conversationRemoveAll = trpc.conversations.removeAll.useMutation()
+    # Shares the cached result of the page's conversations.list query without fetching it again.
+    conversationsListQuery = trpc.conversations.list.useQuery(None, { 'enabled': False })
     homeContext = useContext(HomeContext)
     defaultModelId = homeContext['state']['defaultModelId']
     conversations = homeContext['state']['conversations']
     selectedConversation = homeContext['state']['selectedConversation']
     settings = homeContext['state']['settings']
     dispatch = homeContext['dispatch']
+    # Content hash of each conversation as last saved by the server, keyed by id.
+    syncedHashes = useRef({})
+
+    def seedSyncedHashes() -> None:
+        # Conversations loaded from the server are synced by definition, so the
+        # first updateAll after a page load only sends what changed since.
+        for conversation in conversationsListQuery.data or []:
+            syncedHashes.current[conversation['id']] = get_conversation_hash(conversation)
+
+    useEffect(seedSyncedHashes, [conversationsListQuery.data])
+
+    def onSaved(conversation: Conversation) -> Dict[str, Any]:
+        # Mutation options that record the conversation as synced once the server has saved it.
+        conversationHash = get_conversation_hash(conversation)
+
+        def onSuccess(_) -> None:
+            syncedHashes.current[conversation['id']] = conversationHash
+
+        return { 'onSuccess': onSuccess }
 
     def updateAll(updated: List[Conversation]) -> List[Conversation]:
         """
         Updates all conversations.
 
+        Only conversations whose content changed since they were last saved
+        by the server are included in the mutation. A conversation is recorded
+        as saved only once its result comes back ok, so failed ones are sent again.
+
         Args:
             updated: The updated conversations.
 
         Returns:
             The updated conversations.
         """
-        conversationUpdateAll.mutateAsync(updated)
+        dirty = []
+        dirtyHashes = {}
+        for conversation in updated:
+            conversationHash = get_conversation_hash(conversation)
+            if syncedHashes.current.get(conversation['id']) != conversationHash:
+                dirtyHashes[conversation['id']] = conversationHash
+                dirty.append(conversation)
+
+        def onSuccess(response: Dict[str, Any]) -> None:
+            for result in response['results']:
+                if result['ok']:
+                    syncedHashes.current[result['id']] = dirtyHashes[result['id']]
+
+        if dirty:
+            conversationUpdateAll.mutate(dirty, { 'onSuccess': onSuccess })
         dispatch({ 'field': 'conversations', 'value': updated })
         return updated
 
@@ -75,7 +116,7 @@ def useConversations() -> Tuple[List[Conversation], ConversationsAction]:
             'folderId': None
         }
 
-        conversationUpdate.mutateAsync(newConversation)
+        conversationUpdate.mutate(newConversation, onSaved(newConversation))
         newState = [newConversation, *conversations]
         dispatch({ 'field': 'conversations', 'value': newState })
 
@@ -94,7 +135,7 @@ def useConversations() -> Tuple[List[Conversation], ConversationsAction]:
             The updated conversation.
         """
         newConversations = [conversation if f['id'] == conversation['id'] else f for f in conversations]
-        conversationUpdate.mutateAsync(conversation)
+        conversationUpdate.mutate(conversation, onSaved(conversation))
         dispatch({ 'field': 'conversations', 'value': newConversations })
         if selectedConversation and selectedConversation['id'] == conversation['id']:
             dispatch({ 'field': 'selectedConversation', 'value': conversation })
@@ -117,6 +158,30 @@ def useConversations() -> Tuple[List[Conversation], ConversationsAction]:
             dispatch({ 'field': 'selectedConversation', 'value': updatedConversation })
         return newState
 
+    def appendMessage(conversation: Conversation, message: Dict[str, Any]) -> Conversation:
+        """
+        Appends a message to a conversation.
+
+        Only the new message is sent to the server; earlier messages are not rewritten.
+
+        Args:
+            conversation: The conversation to append to.
+            message: The message to append.
+
+        Returns:
+            The updated conversation.
+        """
+        updatedConversation = { **conversation, 'messages': [*conversation['messages'], message] }
+        conversationAppendMessage.mutate(
+            { 'conversationId': conversation['id'], 'message': message },
+            onSaved(updatedConversation),
+        )
+        newConversations = [updatedConversation if c['id'] == conversation['id'] else c for c in conversations]
+        dispatch({ 'field': 'conversations', 'value': newConversations })
+        if selectedConversation and selectedConversation['id'] == conversation['id']:
+            dispatch({ 'field': 'selectedConversation', 'value': updatedConversation })
+        return updatedConversation
+
     def remove(conversation: Conversation) -> List[Conversation]:
         """
         Removes a conversation.
@@ -128,6 +193,7 @@ def useConversations() -> Tuple[List[Conversation], ConversationsAction]:
             The updated conversations.
         """
         conversationRemove.mutateAsync({ 'id': conversation['id'] })
+        syncedHashes.current.pop(conversation['id'], None)
         updatedConversations = [c for c in conversations if c['id'] != conversation['id']]
         dispatch({ 'field': 'conversations', 'value': updatedConversations })
         return updatedConversations
@@ -140,6 +206,7 @@ def useConversations() -> Tuple[List[Conversation], ConversationsAction]:
             An empty list.
         """
         conversationRemoveAll.mutateAsync()
+        syncedHashes.current = {}
         dispatch({ 'field': 'conversations', 'value': [] })
         return []
 
@@ -148,6 +215,7 @@ def useConversations() -> Tuple[List[Conversation], ConversationsAction]:
         'update': update,
         'updateValue': updateValue,
         'updateAll': updateAll,
+        'appendMessage': appendMessage,
         'remove': remove,
         'clear': clear
     }
@@ -1,5 +1,7 @@
-from typing import Any, Dict
+import asyncio
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
 from utils.app.importExport import cleanData
+from utils.app.streamingImport import importExportStream
 from utils.trpc import trpc
 from types.export import SupportedExportFormats
 from types.settings import Settings
@@ -9,16 +11,20 @@ def useImporter() -> Dict[str, Any]:
     Custom hook for importing data.
 
     Returns:
-        A dictionary with an `importData` function for importing data.
+        A dictionary with an `importData` function for importing parsed data,
+        and an `importFile` function for streaming an export file.
     """
     conversationsMutation = trpc.conversations.updateAll.useMutation()
     foldersMutation = trpc.folders.updateAll.useMutation()
     promptsMutation = trpc.prompts.updateAll.useMutation()
 
-    def importData(settings: Settings, data: SupportedExportFormats):
+    async def importData(settings: Settings, data: SupportedExportFormats):
         """
         Imports data.
 
+        Conversations, folders and prompts are each written with a single
+        bulk updateAll mutation; items the server failed to write are logged.
+
         Args:
             settings: The settings object.
             data: The data to be imported.
@@ -33,11 +39,47 @@ def useImporter() -> Dict[str, Any]:
         folders = cleanedData['folders']
         prompts = cleanedData['prompts']
         conversations = history
-        conversationsMutation.mutateAsync(conversations)
-        foldersMutation.mutateAsync(folders)
-        promptsMutation.mutateAsync(prompts)
+        responses = await asyncio.gather(
+            conversationsMutation.mutateAsync(conversations),
+            foldersMutation.mutateAsync(folders),
+            promptsMutation.mutateAsync(prompts),
+        )
+        for response in responses:
+            failed = [result for result in response['results'] if not result['ok']]
+            for result in failed:
+                print(f"Failed to import {result['id']}: {result['error']}")
         return cleanedData
 
+    mutations = {
+        'conversations': conversationsMutation,
+        'folders': foldersMutation,
+        'prompts': promptsMutation,
+    }
+
+    async def writeBatch(kind: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await mutations[kind].mutateAsync(items)
+
+    async def importFile(settings: Settings, file: BinaryIO,
+                         onProgress: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """
+        Imports an export file in batches, without parsing it into memory whole.
+
+        Args:
+            settings: The settings object.
+            file: The export file, opened in binary mode.
+            onProgress: Called after each batch with the counts and bytes read so far.
+
+        Returns:
+            The import summary, with the number of items written of each kind.
+        """
+        summary = await importExportStream(file, {
+            'temperature': settings.defaultTemperature
+        }, writeBatch, onProgress)
+        for result in summary['failed']:
+            print(f"Failed to import {result['id']}: {result['error']}")
+        return summary
+
     return {
-        'importData': importData
+        'importData': importData,
+        'importFile': importFile
     }
@@ -1,8 +1,42 @@
+import asyncio
+
 from fastapi import FastAPI
 from pydantic import BaseModel
 
+from utils.server.cache import get_cache
+from utils.server.embedcache import get_embedding_cache
+from utils.server.index import close_http_client
+from utils.server.indexes import ensure_indexes
+from utils.server.metrics import all_latency_stats
+from utils.server.storage import close_clients, get_storage, ping_db
+from utils.server.tiktoken import TIKTOKEN_WARM_UP, warm_up_tiktoken_encodings
+
 app = FastAPI()
 
+@app.on_event("startup")
+async def startup():
+    if await asyncio.to_thread(ping_db):
+        await ensure_indexes(get_storage())
+    if TIKTOKEN_WARM_UP:
+        await asyncio.to_thread(warm_up_tiktoken_encodings)
+
+@app.on_event("shutdown")
+async def shutdown():
+    close_clients()
+    await close_http_client()
+
+@app.get("/api/metrics/cache")
+async def cache_metrics():
+    embedding_cache = get_embedding_cache()
+    return {
+        "userData": get_cache().stats(),
+        "embeddings": embedding_cache.stats() if embedding_cache else None,
+    }
+
+@app.get("/api/metrics/latency")
+async def latency_metrics():
+    return all_latency_stats()
+
 # Example data
 users = [
     {"id": 1, "name": "Alice"},
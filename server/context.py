@@ -3,21 +3,81 @@ from auth_utils import getUserHash
 from auth_options import authOptions
 from trpc_server import inferAsyncReturnType
 from trpc_server.adapters.next import CreateNextContextOptions
+from utils.server.cache import LocalCache
+from utils.server.metrics import get_latency_stats
+import hashlib
+import os
+import time
+from typing import Optional
 
-async def createContext(opts: CreateNextContextOptions):
+SESSION_CACHE_TTL_SECONDS = float(os.getenv('SESSION_CACHE_TTL_SECONDS', '10'))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', '10000'))
+SESSION_COOKIE_NAMES = ('__Secure-next-auth.session-token', 'next-auth.session-token')
+
+_sessionCache = LocalCache(max_entries=SESSION_CACHE_MAX_ENTRIES)
+
+def getSessionToken(req) -> Optional[str]:
     """
-    Create the TRPC context for Next.js serverless API routes.
+    Retrieves the next-auth session token from the request cookies.
+
+    Args:
+        req: The Next.js API request object.
+
+    Returns:
+        Optional[str]: The session token, or None if the request has none.
+    """
+    cookies = getattr(req, 'cookies', None) or {}
+    for name in SESSION_COOKIE_NAMES:
+        token = cookies.get(name)
+        if token:
+            return token
+    return None
+
+async def resolveSession(opts: CreateNextContextOptions):
+    """
+    Resolves the session and userHash of a request, caching them by session token.
+
+    A tRPC batch resolves its session once, and requests made with the same
+    token within SESSION_CACHE_TTL_SECONDS reuse the result. The token is
+    hashed before it is used as a cache key.
 
     Args:
         opts (CreateNextContextOptions): Options for creating the context.
 
     Returns:
-        dict: The TRPC context containing the request, response, session, and userHash.
+        tuple: The session and userHash, both None when the request is not signed in.
     """
+    start = time.perf_counter()
+    token = getSessionToken(opts.req)
+    if token is None:
+        get_latency_stats('auth').record((time.perf_counter() - start) * 1000, 'anonymous')
+        return None, None
+
+    key = 'session:' + hashlib.sha256(token.encode('utf-8')).hexdigest()
+    hit, value = await _sessionCache.get(key)
+    if hit:
+        get_latency_stats('auth').record((time.perf_counter() - start) * 1000, 'cached')
+        return value
+
     session = await getServerSession(opts.req, opts.res, authOptions)
     userHash = None
     if session:
-        userHash = await getUserHash(opts.req, opts.res)
+        userHash = await getUserHash(opts.req, opts.res, session)
+    await _sessionCache.set(key, (session, userHash), SESSION_CACHE_TTL_SECONDS)
+    get_latency_stats('auth').record((time.perf_counter() - start) * 1000, 'resolved')
+    return session, userHash
+
+async def createContext(opts: CreateNextContextOptions):
+    """
+    Create the TRPC context for Next.js serverless API routes.
+
+    Args:
+        opts (CreateNextContextOptions): Options for creating the context.
+
+    Returns:
+        dict: The TRPC context containing the request, response, session, and userHash.
+    """
+    session, userHash = await resolveSession(opts)
     return {
         'req': opts.req,
         'res': opts.res,
@@ -1,6 +1,7 @@
-from utils.server.storage import UserDb
-from types.chat import ConversationSchema, ConversationSchemaArray
+from utils.server.storage import CONVERSATION_PAGE_SIZE, UserDb
+from types.chat import ConversationSchema, ConversationSchemaArray, MessageSchema
 from trpc import procedure, router
+from trpc.errors import TRPCError
 from z3 import z
 
 def conversations():
@@ -21,6 +22,40 @@ def conversations():
             userDb = await UserDb.fromUserHash(ctx.userHash)
             return await userDb.getConversations()
         }),
+        listPage=procedure.input(z.object({ limit: z.number().optional(), cursor: z.string().optional() })).query(async ({ ctx, input }) => {
+            """
+            Retrieves one page of conversation summaries for the user, without messages.
+
+            Args:
+                ctx: The context object.
+                input: The input object containing the page size and the cursor of the previous page.
+
+            Returns:
+                A dictionary with the conversation summaries and the cursor of the next page.
+            """
+            userDb = await UserDb.fromUserHash(ctx.userHash)
+            try:
+                return await userDb.getConversationSummaries(input.limit or CONVERSATION_PAGE_SIZE, input.cursor)
+            except ValueError as e:
+                raise TRPCError(code='BAD_REQUEST', message=str(e))
+        }),
+        get=procedure.input(z.object({ id: z.string() })).query(async ({ ctx, input }) => {
+            """
+            Retrieves a single conversation, including its messages.
+
+            Args:
+                ctx: The context object.
+                input: The input object containing the conversation ID.
+
+            Returns:
+                The conversation.
+            """
+            userDb = await UserDb.fromUserHash(ctx.userHash)
+            conversation = await userDb.getConversation(input.id)
+            if not conversation:
+                raise TRPCError(code='NOT_FOUND', message='Conversation not found')
+            return conversation
+        }),
         remove=procedure.input(z.object({ id: z.string() })).mutation(async ({ ctx, input }) => {
             """
             Removes a conversation.
@@ -65,6 +100,21 @@ def conversations():
             await userDb.saveConversation(input)
             return { success: True }
         }),
+        appendMessage=procedure.input(z.object({ conversationId: z.string(), message: MessageSchema })).mutation(async ({ ctx, input }) => {
+            """
+            Appends a message to a conversation without rewriting its earlier messages.
+
+            Args:
+                ctx: The context object.
+                input: The input object containing the conversation ID and the message.
+
+            Returns:
+                A dictionary indicating the success of the operation and the message index.
+            """
+            userDb = await UserDb.fromUserHash(ctx.userHash)
+            index = await userDb.appendMessage(input.conversationId, input.message)
+            return { success: True, index: index }
+        }),
         updateAll=procedure.input(ConversationSchemaArray).mutation(async ({ ctx, input }) => {
             """
             Updates multiple conversations.
@@ -74,10 +124,10 @@ def conversations():
                 input: The input object containing an array of conversation data.
 
             Returns:
-                A dictionary indicating the success of the operation.
+                A dictionary indicating the success of the operation and per-item results.
             """
             userDb = await UserDb.fromUserHash(ctx.userHash)
-            await userDb.saveConversations(input)
-            return { success: True }
+            results = await userDb.saveConversations(input)
+            return { success: all(result['ok'] for result in results), results: results }
         }),
     )
@@ -75,10 +75,10 @@ def folders():
                 input: The input object containing an array of folder data.
 
             Returns:
-                A dictionary indicating the success of the operation.
+                A dictionary indicating the success of the operation and per-item results.
             """
             userDb = await UserDb.fromUserHash(ctx.userHash)
-            await userDb.saveFolders(input)
-            return { success: True }
+            results = await userDb.saveFolders(input)
+            return { success: all(result['ok'] for result in results), results: results }
         }),
     )
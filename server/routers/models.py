@@ -1,24 +1,52 @@
 from utils.app.const import OPENAI_API_HOST, OPENAI_API_TYPE, OPENAI_API_VERSION, OPENAI_ORGANIZATION
-from types.openai import OpenAIModel, OpenAIModelID, OpenAIModels
+from types.openai import OpenAIModel, OpenAIModels
 from trpc import procedure, router
 from trpc.errors import TRPCError
+import asyncio
+import hashlib
+import os
+import time
 import requests
-from typing import Optional
+from typing import Dict, List, Set, Tuple
 from zod import z
 
-async def get_models(ctx, input):
+MODELS_CACHE_TTL_SECONDS = int(os.getenv('MODELS_CACHE_TTL_SECONDS', '300'))
+MODELS_CACHE_STALE_SECONDS = int(os.getenv('MODELS_CACHE_STALE_SECONDS', '3600'))
+MODELS_REQUEST_TIMEOUT_SECONDS = float(os.getenv('MODELS_REQUEST_TIMEOUT_SECONDS', '10'))
+
+# (API type, sha256 of the key) -> (fetched at, models)
+_models_cache: Dict[Tuple[str, str], Tuple[float, List[OpenAIModel]]] = {}
+_models_refreshes: Dict[Tuple[str, str], asyncio.Future] = {}
+# Background revalidations, referenced until they finish so they are not garbage-collected.
+_revalidations: Set[asyncio.Task] = set()
+
+def _models_cache_key(api_key: str) -> Tuple[str, str]:
     """
-    Retrieve a list of OpenAI models.
+    Returns the cache key of a model list, without keeping the API key itself.
 
     Args:
-        ctx (dict): The TRPC context.
-        input (dict): The input parameters.
+        api_key (str): The API key.
 
     Returns:
-        list: The list of OpenAI models.
+        Tuple[str, str]: The API type and the SHA-256 of the key.
+    """
+    return (OPENAI_API_TYPE, hashlib.sha256(api_key.encode('utf-8')).hexdigest())
+
+def fetch_models(api_key: str) -> List[OpenAIModel]:
     """
-    key = input.get('key')
+    Fetches the models available to a key from the upstream API.
 
+    This is blocking and is run off the event loop by get_models.
+
+    Args:
+        api_key (str): The API key.
+
+    Returns:
+        List[OpenAIModel]: The known models available to the key.
+
+    Raises:
+        TRPCError: If the key is rejected or the upstream request fails.
+    """
     url = f"{OPENAI_API_HOST}/v1/models"
     if OPENAI_API_TYPE == 'azure':
         url = f"{OPENAI_API_HOST}/openai/deployments?api-version={OPENAI_API_VERSION}"
@@ -27,13 +55,17 @@ async def get_models(ctx, input):
         'Content-Type': 'application/json',
     }
     if OPENAI_API_TYPE == 'openai':
-        headers['Authorization'] = f"Bearer {key or os.environ['OPENAI_API_KEY']}"
+        headers['Authorization'] = f"Bearer {api_key}"
     elif OPENAI_API_TYPE == 'azure':
-        headers['api-key'] = f"{key or os.environ['OPENAI_API_KEY']}"
+        headers['api-key'] = f"{api_key}"
     if OPENAI_API_TYPE == 'openai' and OPENAI_ORGANIZATION:
         headers['OpenAI-Organization'] = OPENAI_ORGANIZATION
 
-    response = requests.get(url, headers=headers)
+    try:
+        response = requests.get(url, headers=headers, timeout=MODELS_REQUEST_TIMEOUT_SECONDS)
+    except requests.RequestException as error:
+        print(f"OpenAI API request failed: {error}")
+        raise TRPCError(code='INTERNAL_SERVER_ERROR', message='OpenAI API returned an error')
 
     if response.status_code == 401:
         raise TRPCError(code='UNAUTHORIZED', message='Unauthorized')
@@ -46,20 +78,94 @@ async def get_models(ctx, input):
     models = []
     for model in json_data['data']:
         model_name = model['model'] if OPENAI_API_TYPE == 'azure' else model['id']
-        for key, value in OpenAIModelID.items():
-            if value == model_name:
-                model_info = OpenAIModels[value]
-                model_obj = OpenAIModel(
-                    id=model['id'],
-                    name=model_info['name'],
-                    maxLength=model_info['maxLength'],
-                    tokenLimit=model_info['tokenLimit'],
-                )
-                models.append(model_obj)
-                break
+        model_info = OpenAIModels.get(model_name)
+        if model_info is not None:
+            models.append(OpenAIModel(
+                id=model['id'],
+                name=model_info.name,
+                maxLength=model_info.maxLength,
+                tokenLimit=model_info.tokenLimit,
+            ))
 
     return models
 
+async def refresh_models(api_key: str) -> List[OpenAIModel]:
+    """
+    Fetches the models of a key and caches them.
+
+    Concurrent refreshes of the same key share one upstream request. A
+    rejected key drops its cached entry.
+
+    Args:
+        api_key (str): The API key.
+
+    Returns:
+        List[OpenAIModel]: The known models available to the key.
+
+    Raises:
+        TRPCError: If the key is rejected or the upstream request fails.
+    """
+    cache_key = _models_cache_key(api_key)
+    refresh = _models_refreshes.get(cache_key)
+    if refresh is not None:
+        return list(await asyncio.shield(refresh))
+
+    refresh = asyncio.get_running_loop().create_future()
+    _models_refreshes[cache_key] = refresh
+    try:
+        models = await asyncio.to_thread(fetch_models, api_key)
+    except BaseException as error:
+        if isinstance(error, TRPCError) and error.code == 'UNAUTHORIZED':
+            _models_cache.pop(cache_key, None)
+        refresh.set_exception(error)
+        # Waiters re-raise the error; retrieve it so an unawaited refresh is not logged.
+        refresh.exception()
+        raise
+    else:
+        _models_cache[cache_key] = (time.monotonic(), models)
+        refresh.set_result(models)
+        return list(models)
+    finally:
+        _models_refreshes.pop(cache_key, None)
+
+async def _revalidate_models(api_key: str) -> None:
+    try:
+        await refresh_models(api_key)
+    except Exception as error:
+        print(f"Failed to refresh the model list, serving the cached one: {error}")
+
+async def get_models(ctx, input):
+    """
+    Retrieve a list of OpenAI models.
+
+    The list is cached per API type and key for MODELS_CACHE_TTL_SECONDS.
+    After that, and for up to MODELS_CACHE_STALE_SECONDS more, the cached list
+    is returned right away while it is refreshed in the background, so an
+    upstream error keeps serving the last good list.
+
+    Args:
+        ctx (dict): The TRPC context.
+        input (dict): The input parameters.
+
+    Returns:
+        list: The list of OpenAI models.
+    """
+    api_key = input.get('key') or os.environ['OPENAI_API_KEY']
+
+    entry = _models_cache.get(_models_cache_key(api_key))
+    if entry is not None:
+        fetched_at, models = entry
+        age = time.monotonic() - fetched_at
+        if age < MODELS_CACHE_TTL_SECONDS:
+            return list(models)
+        if age < MODELS_CACHE_TTL_SECONDS + MODELS_CACHE_STALE_SECONDS:
+            task = asyncio.ensure_future(_revalidate_models(api_key))
+            _revalidations.add(task)
+            task.add_done_callback(_revalidations.discard)
+            return list(models)
+
+    return await refresh_models(api_key)
+
 models = router({
     'list': procedure.input(z.object({
         'key': z.string().optional()
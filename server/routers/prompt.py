@@ -55,11 +55,11 @@ async def update_all_prompts(ctx, input):
         input (list): The updated prompts.
 
     Returns:
-        dict: The success status of the update.
+        dict: The success status of the update and per-prompt results.
     """
     userDb = await UserDb.fromUserHash(ctx['userHash'])
-    await userDb.savePrompts(input)
-    return {'success': True}
+    results = await userDb.savePrompts(input)
+    return {'success': all(result['ok'] for result in results), 'results': results}
 
 prompts = router({
     'list': procedure.query(get_prompts),
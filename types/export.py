@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import List, Optional, Union
 
 from chat import Conversation, Message
 from folder import FolderInterface
@@ -35,5 +35,21 @@ class ExportFormatV4:
         self.folders = folders
         self.prompts = prompts
 
-SupportedExportFormats = Union[ExportFormatV1, ExportFormatV2, ExportFormatV3, ExportFormatV4]
+class ExportFormatV5:
+    """
+    An incremental export: the items saved after since and up to until.
+
+    since is None for a full export. Deleted items are not recorded.
+    """
+
+    def __init__(self, since: Optional[str], until: str, history: List[Conversation],
+                 folders: List[FolderInterface], prompts: List[Prompt]):
+        self.version = 5
+        self.since = since
+        self.until = until
+        self.history = history
+        self.folders = folders
+        self.prompts = prompts
+
+SupportedExportFormats = Union[ExportFormatV1, ExportFormatV2, ExportFormatV3, ExportFormatV4, ExportFormatV5]
 LatestExportFormat = ExportFormatV4
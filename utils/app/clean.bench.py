@@ -0,0 +1,54 @@
+"""
+Run from the repository root: PYTHONPATH=. python -P utils/app/clean.bench.py
+"""
+import time
+from types import SimpleNamespace
+
+from utils.app.clean import clean_conversation_dicts, clean_conversation_history
+
+CONVERSATIONS = 100_000
+MESSAGES = 4
+FALLBACK = {'temperature': 1.0}
+
+def make_history(conversations=CONVERSATIONS, messages=MESSAGES):
+    """Builds parsed export history, half of it missing the fields cleaning fills in."""
+    history = []
+    for i in range(conversations):
+        conversation = {
+            'id': f'conversation-{i}',
+            'name': f'Conversation {i}',
+            'messages': [
+                {'role': 'user' if j % 2 == 0 else 'assistant', 'content': f'Message {j}'}
+                for j in range(messages)
+            ],
+            'folderId': None,
+        }
+        if i % 2:
+            conversation.update({
+                'model': {'id': 'gpt-4', 'name': 'GPT-4', 'maxLength': 24000, 'tokenLimit': 8000},
+                'prompt': 'You are a helpful assistant.',
+                'temperature': 0.7,
+                'folderId': 'folder-1',
+            })
+        history.append(conversation)
+    return history
+
+def objects(history):
+    """Baseline: the per-item object cleaner, after building one object per conversation."""
+    empty = {'model': None, 'prompt': None, 'temperature': None}
+    return clean_conversation_history(
+        [SimpleNamespace(**{**empty, **conversation}) for conversation in history], FALLBACK
+    )
+
+def bench(name, fn):
+    history = make_history()
+    start = time.perf_counter()
+    cleaned = fn(history)
+    elapsed = time.perf_counter() - start
+    print(f'{name}: {elapsed * 1000:.0f} ms for {len(cleaned)} conversations')
+    return cleaned
+
+if __name__ == '__main__':
+    batched = bench('clean_conversation_dicts', lambda history: clean_conversation_dicts(history, FALLBACK))
+    assert len(batched) == CONVERSATIONS
+    bench('clean_conversation_history on objects', objects)
@@ -1,21 +1,17 @@
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from pydantic import BaseModel
 
+from utils.app.const import FALLBACK_MODEL
+
 class Conversation(BaseModel):
     # Define the Conversation fields
     # Replace with the actual fields and types
-
-class OpenAIModelID(BaseModel):
-    # Define the OpenAIModelID fields
-    # Replace with the actual fields and types
-
-class OpenAIModels(BaseModel):
-    # Define the OpenAIModels fields
-    # Replace with the actual fields and types
+    pass
 
 class Settings(BaseModel):
     # Define the Settings fields
     # Replace with the actual fields and types
+    pass
 
 DEFAULT_SYSTEM_PROMPT = 'default_system_prompt'
 
@@ -24,7 +20,7 @@ def clean_selected_conversation(settings: Settings, conversation: Conversation)
 
     # Check for model on each conversation
     if not updated_conversation.model:
-        updated_conversation.model = OpenAIModels[OpenAIModelID.GPT_3_5]
+        updated_conversation.model = dict(FALLBACK_MODEL)
 
     # Check for system prompt on each conversation
     if not updated_conversation.prompt:
@@ -47,7 +43,7 @@ def clean_conversation_history(history: List[Conversation], fallback: dict) -> L
     for conversation in history:
         try:
             if not conversation.model:
-                conversation.model = OpenAIModels[OpenAIModelID.GPT_3_5]
+                conversation.model = dict(FALLBACK_MODEL)
 
             if not conversation.prompt:
                 conversation.prompt = DEFAULT_SYSTEM_PROMPT
@@ -64,3 +60,122 @@ def clean_conversation_history(history: List[Conversation], fallback: dict) -> L
 
     return cleaned_history
 
+# Validation and defaults for conversations parsed from JSON. A field with a
+# default is replaced when missing or falsy, as the object cleaners do.
+MESSAGE_SCHEMA = {
+    'role': {'type': (str,), 'required': True, 'enum': ('system', 'assistant', 'user')},
+    'content': {'type': (str,), 'required': True},
+}
+
+CONVERSATION_SCHEMA = {
+    'id': {'type': (str, int), 'required': True},
+    'name': {'type': (str,)},
+    'messages': {'type': (list,), 'required': True, 'items': MESSAGE_SCHEMA},
+    'model': {'type': (dict,), 'default': 'model', 'copy': True},
+    'prompt': {'type': (str,), 'default': 'prompt'},
+    'temperature': {'type': (int, float), 'default': 'temperature'},
+    'folderId': {'type': (str,), 'default': 'folderId'},
+}
+
+def _schema_lines(schema: Dict[str, dict], item: str, indent: str, namespace: dict) -> List[str]:
+    lines = [f'{indent}if type({item}) is not dict:', f'{indent}    return False']
+    for field, rule in schema.items():
+        key = f'_{len(namespace)}'
+        namespace[f'types{key}'] = rule['type']
+        value = f'value{key}'
+        lines.append(f'{indent}{value} = {item}.get({field!r})')
+        if 'default' in rule:
+            default = f'defaults[{rule["default"]!r}]'
+            if rule.get('copy'):
+                default = f'dict({default})'
+            lines += [
+                f'{indent}if not {value}:',
+                f'{indent}    {item}[{field!r}] = {default}',
+                f'{indent}elif not isinstance({value}, types{key}):',
+                f'{indent}    return False',
+            ]
+        elif rule.get('required'):
+            lines += [f'{indent}if {value} is None or not isinstance({value}, types{key}):', f'{indent}    return False']
+        else:
+            lines += [f'{indent}if {value} is not None and not isinstance({value}, types{key}):', f'{indent}    return False']
+        if 'enum' in rule:
+            namespace[f'enum{key}'] = frozenset(rule['enum'])
+            lines += [f'{indent}if {value} not in enum{key}:', f'{indent}    return False']
+        if 'items' in rule:
+            lines.append(f'{indent}for element{key} in {value}:')
+            lines += _schema_lines(rule['items'], f'element{key}', indent + '    ', namespace)
+    return lines
+
+def compile_schema(schema: Dict[str, dict], name: str = 'clean') -> Callable[[Any, dict], bool]:
+    """
+    Compiles a field schema into a function that validates a dict and fills in its defaults.
+
+    The checks, including those of nested list items, are generated once as
+    straight-line Python, so cleaning an item costs a few dict lookups and
+    isinstance calls per field.
+
+    Args:
+        schema (Dict[str, dict]): The rules by field: 'type' (a tuple of types), and optionally 'required',
+            'enum', 'items' (the schema of list items), 'default' (a key of the defaults) and 'copy'.
+        name (str, optional): The name of the generated function. Defaults to 'clean'.
+
+    Returns:
+        Callable[[Any, dict], bool]: Takes an item and the default values, fills in the defaults, and returns
+            whether the item is valid.
+    """
+    namespace = {}
+    lines = [f'def {name}(item, defaults):', *_schema_lines(schema, 'item', '    ', namespace), '    return True']
+    exec('\n'.join(lines), namespace)
+    return namespace[name]
+
+_clean_conversation = compile_schema(CONVERSATION_SCHEMA, 'clean_conversation')
+
+def _conversation_defaults(fallback: dict) -> dict:
+    return {
+        'model': FALLBACK_MODEL,
+        'prompt': DEFAULT_SYSTEM_PROMPT,
+        'temperature': fallback['temperature'],
+        'folderId': None,
+    }
+
+def clean_conversation_dicts(history: Any, fallback: dict) -> List[Dict[str, Any]]:
+    """
+    Cleans conversations parsed from JSON in one pass, in place.
+
+    Each conversation is checked against CONVERSATION_SCHEMA and its missing
+    model, prompt, temperature and folderId are filled in, like
+    clean_conversation_history does for objects. Invalid conversations are
+    dropped.
+
+    Args:
+        history (Any): The parsed conversations.
+        fallback (dict): The fallback values, with 'temperature'.
+
+    Returns:
+        List[Dict[str, Any]]: The valid, cleaned conversations.
+    """
+    if not isinstance(history, list):
+        print('history is not an array. Returning an empty array.')
+        return []
+
+    defaults = _conversation_defaults(fallback)
+    cleaned = [conversation for conversation in history if _clean_conversation(conversation, defaults)]
+    if len(cleaned) < len(history):
+        print(f'Removed {len(history) - len(cleaned)} invalid conversations while cleaning history.')
+    return cleaned
+
+def clean_conversation_dict(conversation: Any, fallback: dict) -> Optional[Dict[str, Any]]:
+    """
+    Cleans one conversation parsed from JSON, like clean_conversation_history does for objects.
+
+    Args:
+        conversation (Any): The parsed conversation.
+        fallback (dict): The fallback values, with 'temperature'.
+
+    Returns:
+        Optional[Dict[str, Any]]: The cleaned conversation, or None if it does not match CONVERSATION_SCHEMA.
+    """
+    if not _clean_conversation(conversation, _conversation_defaults(fallback)):
+        print('Error while cleaning conversations\' history. Removing culprit:', conversation)
+        return None
+    return conversation
@@ -0,0 +1,94 @@
+import unittest
+from unittest import TestCase
+
+from .clean import clean_conversation_dict, clean_conversation_dicts, compile_schema
+from .const import FALLBACK_MODEL
+
+FALLBACK = {'temperature': 1.0}
+
+def conversation(**fields):
+    return {
+        'id': '1',
+        'name': 'Conversation',
+        'messages': [{'role': 'user', 'content': 'Hello'}, {'role': 'assistant', 'content': 'Hi'}],
+        'model': {'id': 'gpt-4', 'name': 'GPT-4', 'maxLength': 24000, 'tokenLimit': 8000},
+        'prompt': 'Be brief.',
+        'temperature': 0.5,
+        'folderId': 'folder-1',
+        **fields,
+    }
+
+class CompileSchemaTestCase(TestCase):
+    def test_types_and_required_fields(self):
+        clean = compile_schema({
+            'id': {'type': (str,), 'required': True},
+            'name': {'type': (str,)},
+        })
+        self.assertTrue(clean({'id': 'a'}, {}))
+        self.assertTrue(clean({'id': 'a', 'name': None}, {}))
+        self.assertFalse(clean({'name': 'a'}, {}))
+        self.assertFalse(clean({'id': 1}, {}))
+        self.assertFalse(clean({'id': 'a', 'name': 1}, {}))
+        self.assertFalse(clean(['id'], {}))
+
+    def test_falsy_values_get_defaults(self):
+        clean = compile_schema({'temperature': {'type': (int, float), 'default': 'temperature'}})
+        for value in (None, 0, 0.0):
+            item = {'temperature': value}
+            self.assertTrue(clean(item, {'temperature': 1.0}))
+            self.assertEqual(item['temperature'], 1.0)
+        item = {}
+        self.assertTrue(clean(item, {'temperature': 1.0}))
+        self.assertEqual(item, {'temperature': 1.0})
+        self.assertFalse(clean({'temperature': 'hot'}, {'temperature': 1.0}))
+
+class CleanConversationDictsTestCase(TestCase):
+    def test_valid_conversation_is_kept(self):
+        self.assertEqual(clean_conversation_dicts([conversation()], FALLBACK), [conversation()])
+
+    def test_missing_fields_are_filled_in(self):
+        [cleaned] = clean_conversation_dicts(
+            [conversation(model=None, prompt='', temperature=0, folderId='')], FALLBACK
+        )
+        self.assertEqual(cleaned['model'], FALLBACK_MODEL)
+        self.assertTrue(cleaned['prompt'])
+        self.assertEqual(cleaned['temperature'], 1.0)
+        self.assertIsNone(cleaned['folderId'])
+
+    def test_default_model_is_copied(self):
+        first, second = clean_conversation_dicts([conversation(model=None), conversation(model=None)], FALLBACK)
+        self.assertIsNot(first['model'], second['model'])
+        first['model']['name'] = 'Changed'
+        self.assertEqual(second['model'], FALLBACK_MODEL)
+        self.assertEqual(FALLBACK_MODEL['name'], 'GPT-3.5')
+
+    def test_bad_role_is_dropped(self):
+        bad = conversation(messages=[{'role': 'robot', 'content': 'Hello'}])
+        self.assertEqual(clean_conversation_dicts([bad, conversation(id='2')], FALLBACK), [conversation(id='2')])
+
+    def test_messages_are_validated(self):
+        for messages in (
+            [{'role': 'user'}],
+            [{'role': 'user', 'content': 1}],
+            ['Hello'],
+            [{'role': 'user', 'content': 'Hello'}, None],
+            None,
+            'Hello',
+        ):
+            self.assertEqual(clean_conversation_dicts([conversation(messages=messages)], FALLBACK), [])
+
+    def test_ids(self):
+        self.assertEqual(len(clean_conversation_dicts([conversation(id=1)], FALLBACK)), 1)
+        self.assertEqual(clean_conversation_dicts([conversation(id=None)], FALLBACK), [])
+
+    def test_not_a_list(self):
+        self.assertEqual(clean_conversation_dicts({'id': '1'}, FALLBACK), [])
+
+    def test_clean_conversation_dict(self):
+        self.assertEqual(clean_conversation_dict(conversation(prompt=None), FALLBACK)['prompt'],
+                         clean_conversation_dicts([conversation(prompt=None)], FALLBACK)[0]['prompt'])
+        self.assertIsNone(clean_conversation_dict('conversation', FALLBACK))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from clientstream import update_conversation_from_stream
+
+CHUNKS = 2000
+
+class Ref:
+    def __init__(self, current):
+        self.current = current
+
+class Controller:
+    def abort(self):
+        pass
+
+def make_conversation(message_count):
+    return {
+        'id': 'bench',
+        'name': 'Benchmark',
+        'messages': [
+            {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'Message {i}'}
+            for i in range(message_count)
+        ],
+    }
+
+async def make_stream():
+    for i in range(CHUNKS):
+        yield f'token{i} '.encode('utf-8')
+
+def rebuild_per_chunk(conversation, chunks):
+    """Baseline: the previous algorithm, rebuilding every message on each chunk."""
+    text = ''
+    for index, chunk in enumerate(chunks):
+        text += chunk
+        if index == 0:
+            messages = [*conversation['messages'], {'role': 'assistant', 'content': chunk}]
+        else:
+            messages = [
+                {**message, 'content': text} if i == len(conversation['messages']) - 1 else message
+                for i, message in enumerate(conversation['messages'])
+            ]
+        conversation = {**conversation, 'messages': messages}
+    return conversation
+
+async def bench(message_count):
+    dispatched = []
+    conversation = make_conversation(message_count)
+    start = time.perf_counter()
+    result = await update_conversation_from_stream(
+        make_stream(), Controller(), dispatched.append, conversation, Ref(False)
+    )
+    elapsed = time.perf_counter() - start
+
+    chunks = [f'token{i} ' for i in range(CHUNKS)]
+    start = time.perf_counter()
+    baseline = rebuild_per_chunk(conversation, chunks)
+    baseline_elapsed = time.perf_counter() - start
+
+    assert result['messages'] == baseline['messages']
+    print(
+        f'{message_count} messages: {elapsed / CHUNKS * 1e6:.1f} us/chunk '
+        f'(rebuild per chunk: {baseline_elapsed / CHUNKS * 1e6:.1f} us/chunk)'
+    )
+
+if __name__ == '__main__':
+    for message_count in (10, 100, 500):
+        asyncio.run(bench(message_count))
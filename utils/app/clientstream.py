@@ -1,77 +1,78 @@
-from typing import List
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+import codecs
+from typing import Any, AsyncIterable, Dict, List
 
-def update_conversation_from_stream(
-    stream: AsyncGenerator[bytes, None],
+from utils.app.coalescedDispatch import STREAM_DISPATCH_INTERVAL_MS
+from utils.data.throttle import throttle
+
+Conversation = Dict[str, Any]
+
+async def update_conversation_from_stream(
+    stream: AsyncIterable[bytes],
     controller: Any,
     home_dispatch: Any,
     updated_conversation: Conversation,
-    stop_conversation_ref: Any
+    stop_conversation_ref: Any,
+    dispatch_interval: int = STREAM_DISPATCH_INTERVAL_MS
 ) -> Conversation:
     """
     Updates the conversation from a stream of bytes.
 
+    The assistant reply is accumulated in a list of text parts, which are
+    only joined when the conversation is dispatched. The message list is
+    copied once when the reply starts; after that each dispatch only
+    replaces the last message, so its cost does not depend on how many
+    messages the conversation already has. Dispatches are throttled to at
+    most one per dispatch_interval, and the final state is always
+    dispatched.
+
     Args:
-        stream (AsyncGenerator[bytes, None]): The stream of bytes to read.
+        stream (AsyncIterable[bytes]): The stream of bytes to read.
         controller (Any): The controller for the conversation stream.
         home_dispatch (Any): The dispatcher for updating the home screen.
         updated_conversation (Conversation): The initial conversation state.
         stop_conversation_ref (Any): The reference for stopping the conversation.
+        dispatch_interval (int, optional): The minimum time between dispatches, in milliseconds.
 
     Returns:
         Conversation: The updated conversation after reading the stream.
-
-    Raises:
-        StopAsyncIteration: If the stream reading is stopped.
     """
-    reader = stream.__aiter__()
-    decoder = TextDecoder()
-    done = False
-    is_first = True
-    text = ''
-    while not done:
-        if stop_conversation_ref.current:
-            stop_conversation_ref.current = False
-            controller.abort()
-            done = True
-            break
-        try:
-            value = await reader.__anext__()
-            done_reading = False
-        except StopAsyncIteration:
-            done = True
-            done_reading = True
-        chunk_value = decoder.decode(value)
-        text += chunk_value
-        if is_first:
-            is_first = False
-            updated_messages = [
-                *updated_conversation['messages'],
-                {'role': 'assistant', 'content': chunk_value},
-            ]
-            updated_conversation = {
-                **updated_conversation,
-                'messages': updated_messages,
-            }
-            home_dispatch({
-                'field': 'selectedConversation',
-                'value': updated_conversation,
-            })
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts: List[str] = []
+    messages = None
+
+    def dispatch():
+        nonlocal parts, messages, updated_conversation
+        text = ''.join(parts)
+        parts = [text]
+        if messages is None:
+            messages = [*updated_conversation['messages'], {'role': 'assistant', 'content': text}]
+        else:
+            messages[-1] = {**messages[-1], 'content': text}
+        updated_conversation = {
+            **updated_conversation,
+            'messages': messages,
+        }
+        home_dispatch({
+            'field': 'selectedConversation',
+            'value': updated_conversation,
+        })
+
+    throttled_dispatch = throttle(dispatch, dispatch_interval)
+    try:
+        async for value in stream:
+            if stop_conversation_ref.current:
+                stop_conversation_ref.current = False
+                controller.abort()
+                break
+            chunk_value = decoder.decode(value)
+            if chunk_value:
+                parts.append(chunk_value)
+                throttled_dispatch()
         else:
-            updated_messages = [
-                {
-                    **message,
-                    'content': text,
-                } if index == len(updated_conversation['messages']) - 1 else message
-                for index, message in enumerate(updated_conversation['messages'])
-            ]
-            updated_conversation = {
-                **updated_conversation,
-                'messages': updated_messages,
-            }
-            home_dispatch({
-                'field': 'selectedConversation',
-                'value': updated_conversation,
-            })
+            chunk_value = decoder.decode(b'', final=True)
+            if chunk_value:
+                parts.append(chunk_value)
+                throttled_dispatch()
+    finally:
+        throttled_dispatch.flush()
     return updated_conversation
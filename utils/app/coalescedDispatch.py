@@ -0,0 +1,66 @@
+import os
+from threading import Lock
+from typing import Any, Callable, Dict
+
+from utils.data.throttle import throttle
+
+STREAM_DISPATCH_INTERVAL_MS = int(os.getenv('STREAM_DISPATCH_INTERVAL_MS', '33'))
+
+class CoalescedDispatch:
+    """
+    Wraps a home dispatch so that rapid updates of a field reach it at most once per interval.
+
+    Each call records the action as the latest value of its field. The first
+    call dispatches right away; later calls within the interval are merged
+    and dispatched together when it ends. Only the newest action of each
+    field is kept. flush() dispatches whatever is pending and must be called
+    once the updates are done, so the final state is never lost.
+    """
+
+    def __init__(self, dispatch: Callable[[Dict[str, Any]], Any], interval: int = STREAM_DISPATCH_INTERVAL_MS):
+        """
+        Initialize the CoalescedDispatch.
+
+        Args:
+            dispatch (Callable[[Dict[str, Any]], Any]): The dispatch to forward actions to.
+            interval (int, optional): The minimum time between dispatches, in milliseconds.
+        """
+        self._dispatch = dispatch
+        self._lock = Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._throttled = throttle(self._dispatch_pending, interval)
+
+    def __call__(self, action: Dict[str, Any]) -> None:
+        """
+        Records an action and dispatches it, or the newer one replacing it, within the interval.
+
+        Args:
+            action (Dict[str, Any]): The action, with 'field' and 'value'.
+        """
+        with self._lock:
+            self._pending[action['field']] = action
+        self._throttled()
+
+    def dispatch_now(self, action: Dict[str, Any]) -> None:
+        """
+        Flushes pending actions, then dispatches the given action immediately.
+
+        Args:
+            action (Dict[str, Any]): The action, with 'field' and 'value'.
+        """
+        self.flush()
+        self._dispatch(action)
+
+    def flush(self) -> None:
+        """
+        Dispatches all pending actions now.
+        """
+        self._throttled.cancel()
+        self._dispatch_pending()
+
+    def _dispatch_pending(self) -> None:
+        with self._lock:
+            actions = list(self._pending.values())
+            self._pending.clear()
+        for action in actions:
+            self._dispatch(action)
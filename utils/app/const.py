@@ -8,3 +8,5 @@ OPENAI_ORGANIZATION = os.getenv('OPENAI_ORGANIZATION', '')
 AZURE_DEPLOYMENT_ID = os.getenv('AZURE_DEPLOYMENT_ID', '')
 MONGODB_DB = os.getenv('MONGODB_DB', '')
 
+# The model given to conversations saved without one, as in types.openai.OpenAIModels.
+FALLBACK_MODEL = {'id': 'gpt-3.5-turbo', 'name': 'GPT-3.5', 'maxLength': 12000, 'tokenLimit': 4000}
@@ -1,3 +1,7 @@
+import hashlib
+import json
+
+
 def create_conversation_name_from_message(content: str) -> str:
     """
     Creates a conversation name from the given content.
@@ -13,3 +17,21 @@ def create_conversation_name_from_message(content: str) -> str:
 
     """
     return content[:30] + '...' if len(content) > 30 else content
+
+def get_conversation_hash(conversation) -> str:
+    """
+    Computes a content hash of a conversation.
+
+    The conversation is serialized as canonical JSON (sorted keys, no
+    whitespace) so the same content always hashes the same on the client
+    and on the server.
+
+    Args:
+        conversation: The conversation, as a dict or an object with attributes.
+
+    Returns:
+        str: The hex SHA-256 digest of the conversation.
+
+    """
+    serialized = json.dumps(conversation, sort_keys=True, separators=(',', ':'), default=vars)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
@@ -1,15 +1,19 @@
 from typing import List
 from fastapi import FastAPI
 
+from utils.app.coalescedDispatch import STREAM_DISPATCH_INTERVAL_MS, CoalescedDispatch
+
 class HomeUpdater:
-    def __init__(self, app: FastAPI):
+    def __init__(self, app: FastAPI, dispatch_interval: int = STREAM_DISPATCH_INTERVAL_MS):
         """
         Initialize the HomeUpdater with the given FastAPI instance.
 
         Args:
             app (FastAPI): The FastAPI instance.
+            dispatch_interval (int, optional): The minimum time between chunk dispatches, in milliseconds.
         """
         self.app = app
+        self.dispatch = CoalescedDispatch(app.dispatch, dispatch_interval)
 
     def add_message(self, conversation: dict, message: dict) -> dict:
         """
@@ -24,7 +28,7 @@ class HomeUpdater:
         """
         updated_messages = conversation["messages"] + [message]
         conversation["messages"] = updated_messages
-        self.app.dispatch({
+        self.dispatch.dispatch_now({
             "field": "selectedConversation",
             "value": conversation
         })
@@ -34,6 +38,8 @@ class HomeUpdater:
         """
         Append a chunk to the last message in the conversation.
 
+        Chunk updates are coalesced; call flush() after the last chunk.
+
         Args:
             conversation (dict): The conversation dictionary.
             chunk (str): The chunk to be appended.
@@ -43,11 +49,15 @@ class HomeUpdater:
         """
         last_index = len(conversation["messages"]) - 1
         last_message = conversation["messages"][last_index]
-        messages = conversation["messages"][:last_index] + [last_message]
-        conversation["messages"] = messages
-        self.app.dispatch({
+        conversation["messages"][last_index] = {**last_message, "content": last_message["content"] + chunk}
+        self.dispatch({
             "field": "selectedConversation",
             "value": conversation
         })
         return conversation
 
+    def flush(self):
+        """
+        Dispatch any coalesced update that is still pending.
+        """
+        self.dispatch.flush()
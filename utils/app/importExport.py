@@ -24,6 +24,10 @@ class ExportFormatV4(BaseModel):
     # Define the ExportFormatV4 data model
     pass
 
+class ExportFormatV5(BaseModel):
+    # Define the ExportFormatV5 data model
+    pass
+
 class LatestExportFormat(BaseModel):
     # Define the LatestExportFormat data model
     pass
@@ -88,18 +92,34 @@ def isExportFormatV4(obj: Any) -> bool:
     """
     return obj.version == 4
 
+def isExportFormatV5(obj: Any) -> bool:
+    """
+    Check if the given object matches ExportFormatV5, an incremental export.
+
+    Args:
+        obj (Any): The object to check.
+
+    Returns:
+        bool: True if the object matches ExportFormatV5, False otherwise.
+    """
+    return obj.version == 5
+
 isLatestExportFormat = isExportFormatV4
 
 class CleaningFallback(BaseModel):
     temperature: float
 
-def cleanData(data: Union[ExportFormatV1, ExportFormatV2, ExportFormatV3, ExportFormatV4],
+def cleanData(data: Union[ExportFormatV1, ExportFormatV2, ExportFormatV3, ExportFormatV4, ExportFormatV5],
               fallback: CleaningFallback) -> LatestExportFormat:
     """
     Clean the given data based on its export format.
 
+    An incremental V5 export becomes a V4 export holding only its items.
+    Importing it upserts them, which merges the delta into existing data.
+
     Args:
-        data (Union[ExportFormatV1, ExportFormatV2, ExportFormatV3, ExportFormatV4]): The export data to clean.
+        data (Union[ExportFormatV1, ExportFormatV2, ExportFormatV3, ExportFormatV4, ExportFormatV5]): The export data
+            to clean.
         fallback (CleaningFallback): The fallback values.
 
     Returns:
@@ -128,8 +148,53 @@ def cleanData(data: Union[ExportFormatV1, ExportFormatV2, ExportFormatV3, Export
         return LatestExportFormat(**data.dict(), version=4, prompts=[])
     if isExportFormatV4(data):
         return data
+    if isExportFormatV5(data):
+        return LatestExportFormat(
+            version=4,
+            history=cleanConversationHistory(data.history or [], fallback),
+            folders=data.folders or [],
+            prompts=data.prompts or []
+        )
     raise ValueError('Unsupported data format')
 
+def _mergeById(base: List[Any], changes: List[Any]) -> List[Any]:
+    changed = {item.id: item for item in changes}
+    merged = [changed.pop(item.id, item) for item in base]
+    return merged + list(changed.values())
+
+def mergeExportDelta(base: ExportFormatV5, delta: ExportFormatV5) -> ExportFormatV5:
+    """
+    Apply an incremental export on top of an earlier export.
+
+    Changed items replace the base items with the same id, in place; new
+    items are appended. Deletions are not recorded in deltas, so deleted
+    items remain in the result. A chain of deltas must start from a full V5
+    export (since=None): V4 exports carry no until, so there is no way to
+    tell which delta continues them.
+
+    Args:
+        base (ExportFormatV5): A full V5 export, or the result of earlier merges.
+        delta (ExportFormatV5): The next incremental export.
+
+    Returns:
+        ExportFormatV5: The merged export, covering base.since up to delta.until.
+
+    Raises:
+        ValueError: If the base is not a V5 export, or the delta starts after the base ends, which would leave a gap.
+    """
+    if not isExportFormatV5(base):
+        raise ValueError('Deltas can only be merged into a V5 export; start from a full V5 export')
+    if delta.since is not None and (base.until is None or delta.since > base.until):
+        raise ValueError(f'Delta since {delta.since} does not continue an export until {base.until}')
+    return ExportFormatV5(
+        version=5,
+        since=base.since,
+        until=delta.until,
+        history=_mergeById(base.history or [], delta.history or []),
+        folders=_mergeById(base.folders or [], delta.folders or []),
+        prompts=_mergeById(base.prompts or [], delta.prompts or [])
+    )
+
 def currentDate() -> str:
     """
     Get the current date in the format 'month-day'.
@@ -0,0 +1,216 @@
+import json
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Dict, Iterable, Optional
+
+from fastapi.responses import StreamingResponse
+
+from utils.app.importExport import currentDate
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', str(64 * 1024)))
+EXPORT_COMPRESSION_LEVEL = int(os.getenv('EXPORT_COMPRESSION_LEVEL', '6'))
+# Incremental exports stop this long before now, so writes still in flight are picked up by the next delta.
+EXPORT_SAFETY_LAG_SECONDS = float(os.getenv('EXPORT_SAFETY_LAG_SECONDS', '30'))
+
+COMPRESSION_EXTENSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+COMPRESSION_MEDIA_TYPES = {None: 'application/json', 'gzip': 'application/gzip', 'zstd': 'application/zstd'}
+
+_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=vars)
+
+class NoCompressor:
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b''
+
+def getCompressor(compression: Optional[str]):
+    """
+    Creates an incremental compressor.
+
+    Args:
+        compression (Optional[str]): None, 'gzip' or 'zstd'.
+
+    Returns:
+        An object with compress(bytes) and flush(), both returning the compressed bytes produced so far.
+
+    Raises:
+        ValueError: If the compression is unknown or zstandard is not installed.
+    """
+    if compression is None:
+        return NoCompressor()
+    if compression == 'gzip':
+        # wbits=31 writes a gzip header and trailer.
+        return zlib.compressobj(EXPORT_COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError('zstandard is not installed')
+        return zstandard.ZstdCompressor(level=EXPORT_COMPRESSION_LEVEL).compressobj()
+    raise ValueError(f'Unknown compression: {compression}')
+
+def exportFileName(compression: Optional[str] = None) -> str:
+    """
+    Get the file name of an export made today.
+
+    Args:
+        compression (Optional[str]): None, 'gzip' or 'zstd'.
+
+    Returns:
+        str: The file name.
+    """
+    return f"chatbot_ui_history_{currentDate()}.json{COMPRESSION_EXTENSIONS[compression]}"
+
+async def iterExportChunks(history: AsyncIterable[Any], folders: Iterable[Any], prompts: Iterable[Any],
+                           compression: Optional[str] = None,
+                           chunkSize: int = EXPORT_CHUNK_SIZE,
+                           header: Optional[Dict[str, Any]] = None) -> AsyncIterator[bytes]:
+    """
+    Encodes an export in the latest format, one conversation at a time.
+
+    The output is compact JSON with the version first, so importers can
+    detect the format from the leading bytes. Encoded items are gathered
+    into chunks of about chunkSize bytes before they are compressed.
+
+    Args:
+        history (AsyncIterable[Any]): The conversations, such as UserDb.iter_conversations().
+        folders (Iterable[Any]): The folders.
+        prompts (Iterable[Any]): The prompts.
+        compression (Optional[str], optional): None, 'gzip' or 'zstd'. Defaults to None.
+        chunkSize (int, optional): The uncompressed size to gather before compressing. Defaults to EXPORT_CHUNK_SIZE.
+        header (Dict[str, Any], optional): The fields written before history. Defaults to {'version': 4}.
+
+    Yields:
+        bytes: The (compressed) export, in chunks.
+    """
+    compressor = getCompressor(compression)
+    parts = []
+    size = 0
+
+    def add(text: str):
+        nonlocal size
+        parts.append(text)
+        size += len(text)
+
+    def take() -> bytes:
+        nonlocal size
+        data = compressor.compress(''.join(parts).encode('utf-8'))
+        parts.clear()
+        size = 0
+        return data
+
+    add(_encoder.encode(header or {'version': 4})[:-1] + ',"history":[')
+    first = True
+    async for conversation in history:
+        add(_encoder.encode(conversation) if first else ',' + _encoder.encode(conversation))
+        first = False
+        if size >= chunkSize:
+            data = take()
+            if data:
+                yield data
+    add('],"folders":')
+    add(_encoder.encode(list(folders)))
+    add(',"prompts":')
+    add(_encoder.encode(list(prompts)))
+    add('}')
+    data = take() + compressor.flush()
+    if data:
+        yield data
+
+def iterUserExportChunks(userDb, compression: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Encodes the export of a user's data straight from storage.
+
+    Args:
+        userDb (UserDb): The user's storage.
+        compression (Optional[str], optional): None, 'gzip' or 'zstd'. Defaults to None.
+
+    Returns:
+        AsyncIterator[bytes]: The (compressed) export, in chunks.
+    """
+    async def chunks():
+        folders = await userDb.get_folders()
+        prompts = await userDb.get_prompts()
+        async for chunk in iterExportChunks(userDb.iter_conversations(), folders, prompts, compression):
+            yield chunk
+    return chunks()
+
+def iterUserDeltaExportChunks(userDb, since: Optional[str], until: Optional[str] = None,
+                              compression: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Encodes an incremental (V5) export of the items a user saved after since.
+
+    Pass the until of the previous export as since to get the next delta.
+    updatedAt is stamped by the database when a write is applied, and until
+    is never later than now minus EXPORT_SAFETY_LAG_SECONDS, so a write that
+    was in flight while an export ran lands after its until and is included
+    in the next delta.
+
+    Args:
+        userDb (UserDb): The user's storage.
+        since (Optional[str]): The ISO timestamp of the previous export, or None for a full export.
+        until (Optional[str], optional): The ISO timestamp to export up to. Defaults to, and is capped at, now
+            minus EXPORT_SAFETY_LAG_SECONDS.
+        compression (Optional[str], optional): None, 'gzip' or 'zstd'. Defaults to None.
+
+    Returns:
+        AsyncIterator[bytes]: The (compressed) export, in chunks.
+    """
+    sinceTime = datetime.fromisoformat(since) if since else None
+    latest = datetime.now(timezone.utc) - timedelta(seconds=EXPORT_SAFETY_LAG_SECONDS)
+    untilTime = latest
+    if until:
+        requested = datetime.fromisoformat(until)
+        if requested.tzinfo is None:
+            requested = requested.replace(tzinfo=timezone.utc)
+        untilTime = min(requested, latest)
+    header = {'version': 5, 'since': since, 'until': untilTime.isoformat()}
+
+    async def chunks():
+        folders = await userDb.get_folders_changed_since(sinceTime, untilTime)
+        prompts = await userDb.get_prompts_changed_since(sinceTime, untilTime)
+        history = userDb.iter_conversations_changed_since(sinceTime, untilTime)
+        async for chunk in iterExportChunks(history, folders, prompts, compression, header=header):
+            yield chunk
+    return chunks()
+
+async def writeExport(chunks: AsyncIterable[bytes], file: BinaryIO) -> int:
+    """
+    Writes export chunks to a binary file.
+
+    Args:
+        chunks (AsyncIterable[bytes]): The export chunks.
+        file (BinaryIO): The file, opened in binary mode.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    written = 0
+    async for chunk in chunks:
+        file.write(chunk)
+        written += len(chunk)
+    return written
+
+def exportResponse(userDb, compression: Optional[str] = None) -> StreamingResponse:
+    """
+    Streams the export of a user's data as a file download.
+
+    Args:
+        userDb (UserDb): The user's storage.
+        compression (Optional[str], optional): None, 'gzip' or 'zstd'. Defaults to None.
+
+    Returns:
+        StreamingResponse: The response, sent as it is encoded.
+    """
+    # Fail before the response has started if the compression is unavailable.
+    getCompressor(compression)
+    return StreamingResponse(
+        iterUserExportChunks(userDb, compression),
+        media_type=COMPRESSION_MEDIA_TYPES[compression],
+        headers={'Content-Disposition': f'attachment; filename="{exportFileName(compression)}"'},
+    )
@@ -0,0 +1,207 @@
+import os
+import re
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.app.clean import clean_conversation_dicts
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '200'))
+SNIFF_BYTES = 4096
+
+SUPPORTED_VERSIONS = (3, 4, 5)
+_VERSION_RE = re.compile(rb'"version"\s*:\s*(\d+)')
+_START_EVENTS = ('start_map', 'start_array')
+_END_EVENTS = ('end_map', 'end_array')
+
+WriteBatch = Callable[[str, List[Dict[str, Any]]], Awaitable[Dict[str, Any]]]
+ProgressCallback = Callable[[Dict[str, Any]], Any]
+
+class CountingReader:
+    """
+    Wraps a binary file and counts the bytes read from it.
+    """
+
+    def __init__(self, file: BinaryIO, head: bytes = b''):
+        self._file = file
+        self._head = head
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if self._head:
+            data, self._head = self._head, b''
+            if size < 0:
+                data += self._file.read()
+            elif size > len(data):
+                data += self._file.read(size - len(data))
+            else:
+                data, self._head = data[:size], data[size:]
+        else:
+            data = self._file.read(size)
+        self.bytes_read += len(data)
+        return data
+
+def detectExportFormat(head: bytes) -> Optional[int]:
+    """
+    Detects the export format from the leading bytes of a file.
+
+    V1 exports are a JSON array. V2 to V5 are objects; exports write the
+    version first, so it is usually found in the leading bytes. When it is
+    not, the format is settled once the whole object has been read.
+
+    Args:
+        head (bytes): The leading bytes of the file.
+
+    Returns:
+        Optional[int]: 1 for an array, the version if one was found, None for an object without one yet.
+
+    Raises:
+        ValueError: If the data is not a JSON array or object, or its version is unsupported.
+    """
+    stripped = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    if stripped.startswith(b'['):
+        return 1
+    if not stripped.startswith(b'{'):
+        raise ValueError('Unsupported data format')
+    match = _VERSION_RE.search(stripped)
+    if match is None:
+        return None
+    version = int(match.group(1))
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f'Unsupported export version: {version}')
+    return version
+
+def iterValues(events: Iterator[Tuple[str, str, Any]], prefixes: Tuple[str, ...]) -> Iterator[Tuple[str, Any]]:
+    """
+    Builds each complete value found at one of the given ijson prefixes.
+
+    Only one value is held in memory at a time.
+
+    Args:
+        events (Iterator[Tuple[str, str, Any]]): The events of ijson.parse.
+        prefixes (Tuple[str, ...]): The prefixes to build values at, such as 'history.item'.
+
+    Yields:
+        Tuple[str, Any]: The prefix and the value.
+    """
+    builder = None
+    depth = 0
+    current = None
+    for prefix, event, value in events:
+        if builder is None:
+            if prefix not in prefixes or event == 'map_key' or event in _END_EVENTS:
+                continue
+            if event not in _START_EVENTS:
+                yield prefix, value
+                continue
+            builder = ijson.ObjectBuilder()
+            current = prefix
+            depth = 0
+        builder.event(event, value)
+        if event in _START_EVENTS:
+            depth += 1
+        elif event in _END_EVENTS:
+            depth -= 1
+            if depth == 0:
+                yield current, builder.value
+                builder = None
+
+async def importExportStream(file: BinaryIO, fallback: dict, writeBatch: WriteBatch,
+                             onProgress: Optional[ProgressCallback] = None,
+                             batchSize: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Imports an export file of any supported format without loading it whole.
+
+    Conversations are parsed one at a time and written in batches of
+    batchSize as soon as a batch is full, each cleaned in one pass. Folders and prompts are small,
+    so they are buffered and written after the conversations, once the
+    format is known and V2 folders can be converted. Items are upserted by
+    id, so importing an incremental (V5) export merges it into the existing
+    data.
+
+    Args:
+        file (BinaryIO): The export file, opened in binary mode.
+        fallback (dict): The cleaning fallback values, with 'temperature'.
+        writeBatch (WriteBatch): Writes a batch of 'conversations', 'folders' or 'prompts' and returns the
+            updateAll response, with per-item 'results'.
+        onProgress (ProgressCallback, optional): Called after each batch with the counts and bytes read so far.
+        batchSize (int, optional): The number of items per write. Defaults to IMPORT_BATCH_SIZE.
+
+    Returns:
+        Dict[str, Any]: The version, the since/until watermarks of a V5 export, the number of items written of
+            each kind, and the failed results.
+
+    Raises:
+        ValueError: If ijson is not installed or the data format is unsupported.
+    """
+    if ijson is None:
+        raise ValueError('ijson is not installed')
+
+    head = file.read(SNIFF_BYTES)
+    version = detectExportFormat(head)
+    reader = CountingReader(file, head)
+    try:
+        totalBytes = os.fstat(file.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        totalBytes = None
+
+    summary = {'version': version, 'since': None, 'until': None, 'conversations': 0, 'folders': 0, 'prompts': 0,
+               'failed': []}
+
+    async def write(kind: str, items: List[Dict[str, Any]]):
+        if not items:
+            return
+        response = await writeBatch(kind, items)
+        summary[kind] += len(items)
+        summary['failed'].extend(result for result in response['results'] if not result['ok'])
+        if onProgress is not None:
+            onProgress({
+                'conversations': summary['conversations'],
+                'folders': summary['folders'],
+                'prompts': summary['prompts'],
+                'bytesRead': reader.bytes_read,
+                'totalBytes': totalBytes,
+            })
+
+    prefixes = ('item',) if version == 1 else (
+        'version', 'since', 'until', 'history.item', 'folders.item', 'prompts.item'
+    )
+    conversations = []
+    folders = []
+    prompts = []
+    sawHistory = False
+    for prefix, value in iterValues(ijson.parse(reader, use_float=True), prefixes):
+        if prefix == 'version':
+            version = int(value)
+        elif prefix in ('since', 'until'):
+            summary[prefix] = value
+        elif prefix in ('item', 'history.item'):
+            sawHistory = True
+            conversations.append(value)
+            if len(conversations) >= batchSize:
+                await write('conversations', clean_conversation_dicts(conversations, fallback))
+                conversations = []
+        elif prefix == 'folders.item':
+            folders.append(value)
+        else:
+            prompts.append(value)
+    await write('conversations', clean_conversation_dicts(conversations, fallback))
+
+    if version is None:
+        if not sawHistory and not folders:
+            raise ValueError('Unsupported data format')
+        # V2 folders only have a numeric id and a name.
+        folders = [{'id': str(folder['id']), 'name': folder['name'], 'type': 'chat'} for folder in folders]
+        version = 2
+    elif version != 1 and version not in SUPPORTED_VERSIONS:
+        raise ValueError(f'Unsupported export version: {version}')
+    summary['version'] = version
+
+    for start in range(0, len(folders), batchSize):
+        await write('folders', folders[start:start + batchSize])
+    for start in range(0, len(prompts), batchSize):
+        await write('prompts', prompts[start:start + batchSize])
+    return summary
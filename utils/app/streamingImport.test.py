@@ -0,0 +1,109 @@
+import asyncio
+import io
+import json
+import unittest
+from unittest import TestCase
+
+from .streamingImport import detectExportFormat, ijson, importExportStream, iterValues
+
+CONVERSATION = {
+    'id': '1',
+    'name': 'Conversation',
+    'messages': [{'role': 'user', 'content': 'Hello'}],
+    'model': {'id': 'gpt-4', 'name': 'GPT-4', 'maxLength': 24000, 'tokenLimit': 8000},
+    'prompt': 'Be brief.',
+    'temperature': 0.5,
+    'folderId': None,
+}
+
+class ChunkedReader:
+    """
+    A binary file that returns at most size bytes per read, like a socket.
+    """
+
+    def __init__(self, data: bytes, size: int):
+        self._file = io.BytesIO(data)
+        self._size = size
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(self._size if size < 0 else min(size, self._size))
+
+def exportBytes(version):
+    conversations = [{**CONVERSATION, 'id': str(i), 'name': f'Conversation {i}'} for i in range(5)]
+    if version == 1:
+        return json.dumps(conversations).encode('utf-8')
+    if version == 2:
+        return json.dumps({'history': conversations, 'folders': [{'id': 1, 'name': 'Folder'}]}).encode('utf-8')
+    return json.dumps({
+        'version': 4,
+        'history': conversations,
+        'folders': [{'id': 'f1', 'name': 'Folder', 'type': 'chat'}],
+        'prompts': [{'id': 'p1', 'name': 'Prompt', 'content': 'Say hi'}],
+    }).encode('utf-8')
+
+class DetectExportFormatTestCase(TestCase):
+    def test_versions(self):
+        self.assertEqual(detectExportFormat(exportBytes(1)[:7]), 1)
+        self.assertIsNone(detectExportFormat(exportBytes(2)))
+        self.assertEqual(detectExportFormat(b'\xef\xbb\xbf ' + exportBytes(4)), 4)
+        self.assertIsNone(detectExportFormat(exportBytes(4)[:8]))
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            detectExportFormat(b'"history"')
+        with self.assertRaises(ValueError):
+            detectExportFormat(b'{"version": 9}')
+
+@unittest.skipIf(ijson is None, 'ijson is not installed')
+class IterValuesTestCase(TestCase):
+    def values(self, data, prefixes, size=7):
+        return list(iterValues(ijson.parse(ChunkedReader(data, size), use_float=True), prefixes))
+
+    def test_v1_array(self):
+        values = self.values(exportBytes(1), ('item',))
+        self.assertEqual([prefix for prefix, _ in values], ['item'] * 5)
+        self.assertEqual(values[2][1], {**CONVERSATION, 'id': '2', 'name': 'Conversation 2'})
+
+    def test_v2_object(self):
+        values = self.values(exportBytes(2), ('version', 'history.item', 'folders.item'))
+        self.assertEqual([prefix for prefix, _ in values], ['history.item'] * 5 + ['folders.item'])
+        self.assertEqual(values[-1][1], {'id': 1, 'name': 'Folder'})
+
+    def test_v4_object(self):
+        values = self.values(exportBytes(4), ('version', 'history.item', 'folders.item', 'prompts.item'), size=1)
+        self.assertEqual(values[0], ('version', 4))
+        self.assertEqual(values[1][1], {**CONVERSATION, 'id': '0', 'name': 'Conversation 0'})
+        self.assertEqual([prefix for prefix, _ in values[-2:]], ['folders.item', 'prompts.item'])
+
+@unittest.skipIf(ijson is None, 'ijson is not installed')
+class ImportExportStreamTestCase(TestCase):
+    def importBytes(self, data):
+        written = []
+
+        async def writeBatch(kind, items):
+            written.append((kind, [item['id'] for item in items]))
+            return {'success': True, 'results': [{'id': item['id'], 'ok': True, 'error': None} for item in items]}
+
+        summary = asyncio.run(importExportStream(io.BytesIO(data), {'temperature': 1}, writeBatch, batchSize=2))
+        return summary, written
+
+    def test_batches(self):
+        summary, written = self.importBytes(exportBytes(4))
+        self.assertEqual(summary['version'], 4)
+        self.assertEqual((summary['conversations'], summary['folders'], summary['prompts']), (5, 1, 1))
+        self.assertEqual(written, [
+            ('conversations', ['0', '1']),
+            ('conversations', ['2', '3']),
+            ('conversations', ['4']),
+            ('folders', ['f1']),
+            ('prompts', ['p1']),
+        ])
+
+    def test_v2_folders_are_converted(self):
+        summary, written = self.importBytes(exportBytes(2))
+        self.assertEqual(summary['version'], 2)
+        self.assertEqual(written[-1], ('folders', ['1']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from throttle import throttle
+
+CALLS = 200_000
+WRAPPERS = 1_000
+LIMIT_MS = 50
+
+def timer_throttle(func, limit):
+    """Baseline: one threading.Timer per pending trailing call."""
+    lock = threading.Lock()
+    state = {'last_ran': None, 'args': None, 'timer': None}
+
+    def run_pending():
+        with lock:
+            args, state['args'], state['timer'] = state['args'], None, None
+            state['last_ran'] = time.monotonic()
+        if args is not None:
+            func(*args)
+
+    def throttled(*args):
+        now = time.monotonic()
+        with lock:
+            if state['last_ran'] is None or now - state['last_ran'] >= limit / 1000:
+                state['last_ran'] = now
+            else:
+                state['args'] = args
+                if state['timer'] is None:
+                    state['timer'] = threading.Timer(limit / 1000 - (now - state['last_ran']), run_pending)
+                    state['timer'].start()
+                return
+        func(*args)
+
+    return throttled
+
+def bench_calls(name, make):
+    calls = []
+    throttled = make(calls.append, LIMIT_MS)
+    start = time.perf_counter()
+    for i in range(CALLS):
+        throttled(i)
+    elapsed = time.perf_counter() - start
+    print(f'{name}: {elapsed / CALLS * 1e9:.0f} ns per call')
+
+def bench_wrappers(name, make):
+    before = threading.active_count()
+    wrappers = [make(lambda value: None, LIMIT_MS) for _ in range(WRAPPERS)]
+    start = time.perf_counter()
+    for wrapper in wrappers:
+        wrapper(0)
+        wrapper(1)
+    elapsed = time.perf_counter() - start
+    threads = threading.active_count() - before
+    print(f'{name}: {WRAPPERS} pending trailing calls in {elapsed * 1000:.0f} ms, {threads} extra threads')
+    time.sleep(LIMIT_MS / 1000 * 4)
+
+if __name__ == '__main__':
+    bench_calls('scheduler throttle', throttle)
+    bench_calls('timer throttle', timer_throttle)
+    bench_wrappers('scheduler throttle', throttle)
+    bench_wrappers('timer throttle', timer_throttle)
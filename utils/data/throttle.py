@@ -1,39 +1,294 @@
-from typing import Callable, TypeVar
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
+from threading import Condition, Lock, Thread
+import asyncio
+import heapq
+import inspect
+import itertools
 import time
+import traceback
 
-T = TypeVar('T', bound=Callable[..., any])
+T = TypeVar('T', bound=Callable[..., Any])
 
-def throttle(func: T, limit: int) -> T:
+
+class TimerHandle:
     """
-    Throttles the execution of a function based on a time limit.
+    Handle of a callback scheduled on the shared timer thread.
+    """
+
+    def __init__(self, callback: Callable[[], Any]):
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Runs delayed callbacks for every throttled or debounced function on one daemon thread.
+
+    Callbacks are kept in a heap ordered by due time, so any number of
+    pending timers costs a single thread.
+    """
+
+    def __init__(self):
+        self._condition = Condition()
+        self._heap: List[Tuple[float, int, TimerHandle]] = []
+        self._counter = itertools.count()
+        self._thread: Optional[Thread] = None
+
+    def call_later(self, delay: float, callback: Callable[[], Any]) -> TimerHandle:
+        """
+        Schedules a callback on the timer thread.
+
+        Args:
+            delay (float): The delay in seconds.
+            callback (Callable[[], Any]): The callback to run.
+
+        Returns:
+            TimerHandle: A handle whose cancel() prevents the callback from running.
+        """
+        handle = TimerHandle(callback)
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), handle))
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name='throttle-scheduler', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return handle
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    due = self._heap[0][0]
+                    now = time.monotonic()
+                    if due <= now:
+                        handle = heapq.heappop(self._heap)[2]
+                        break
+                    self._condition.wait(due - now)
+            try:
+                handle.callback()
+            except Exception:
+                traceback.print_exc()
+
+
+scheduler = Scheduler()
+
+
+def _call_later(delay: float, callback: Callable[[], Any]):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return scheduler.call_later(delay, callback)
+    return loop.call_later(delay, callback)
+
+
+class RateLimited:
+    """
+    A debounced or throttled wrapper around a function.
+
+    Calls made while the function is waiting are collapsed: only the latest
+    arguments are kept. Depending on leading and trailing, the function runs
+    at the start and/or at the end of a burst of calls. max_wait bounds how
+    long a continuous burst may delay an invocation, which is what turns a
+    debounce into a throttle.
+
+    Timers run on the caller's event loop when called from a coroutine, and
+    on the shared scheduler thread otherwise. If the function returns an
+    awaitable it is scheduled as a task on the running loop, or, from a
+    thread, on the last loop the wrapper was called from. An awaitable
+    returned when there is neither raises TypeError, so coroutine functions
+    must be called from a coroutine at least once.
+    """
+
+    def __init__(self, func: Callable[..., Any], wait: int, leading: bool = False,
+                 trailing: bool = True, max_wait: Optional[int] = None):
+        """
+        Initialize the RateLimited wrapper.
+
+        Args:
+            func (Callable[..., Any]): The function to wrap.
+            wait (int): The wait time in milliseconds.
+            leading (bool, optional): Invoke on the leading edge of a burst. Defaults to False.
+            trailing (bool, optional): Invoke on the trailing edge of a burst. Defaults to True.
+            max_wait (int, optional): The longest time in milliseconds an invocation may be delayed.
+        """
+        self._func = func
+        self._wait = wait / 1000
+        self._leading = leading
+        self._trailing = trailing
+        self._max_wait = None if max_wait is None else max(max_wait, wait) / 1000
+        self._lock = Lock()
+        self._args: Optional[Tuple[tuple, dict]] = None
+        self._last_call: Optional[float] = None
+        self._last_invoke = 0.0
+        self._timer = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __call__(self, *args, **kwargs) -> None:
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        now = time.monotonic()
+        invoke = None
+        with self._lock:
+            is_invoking = self._should_invoke(now)
+            self._args = (args, kwargs)
+            self._last_call = now
+            if is_invoking and self._timer is None:
+                self._last_invoke = now
+                self._timer = _call_later(self._wait, self._timer_expired)
+                if self._leading:
+                    invoke = self._take_args()
+            elif is_invoking and self._max_wait is not None:
+                self._timer.cancel()
+                self._timer = _call_later(self._wait, self._timer_expired)
+                self._last_invoke = now
+                invoke = self._take_args()
+            elif self._timer is None:
+                self._timer = _call_later(self._wait, self._timer_expired)
+        if invoke is not None:
+            self._invoke(invoke)
+
+    def flush(self) -> None:
+        """
+        Runs a pending trailing invocation now instead of waiting for the timer.
+        """
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer.cancel()
+            invoke = self._trailing_edge(time.monotonic())
+        if invoke is not None:
+            self._invoke(invoke)
+
+    def cancel(self) -> None:
+        """
+        Drops any pending invocation and resets the wrapper.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = None
+            self._args = None
+            self._last_call = None
+            self._last_invoke = 0.0
+
+    def pending(self) -> bool:
+        """
+        Returns whether an invocation is waiting for the timer.
+
+        Returns:
+            bool: True if a timer is running.
+        """
+        with self._lock:
+            return self._timer is not None
+
+    def _should_invoke(self, now: float) -> bool:
+        if self._last_call is None:
+            return True
+        since_call = now - self._last_call
+        return (
+            since_call >= self._wait
+            or since_call < 0
+            or (self._max_wait is not None and now - self._last_invoke >= self._max_wait)
+        )
+
+    def _remaining_wait(self, now: float) -> float:
+        remaining = self._wait - (now - self._last_call)
+        if self._max_wait is None:
+            return remaining
+        return min(remaining, self._max_wait - (now - self._last_invoke))
+
+    def _timer_expired(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._should_invoke(now):
+                invoke = self._trailing_edge(now)
+            else:
+                self._timer = _call_later(self._remaining_wait(now), self._timer_expired)
+                return
+        if invoke is not None:
+            self._invoke(invoke)
+
+    def _trailing_edge(self, now: float) -> Optional[Tuple[tuple, dict]]:
+        self._timer = None
+        if self._trailing and self._args is not None:
+            self._last_invoke = now
+            return self._take_args()
+        self._args = None
+        return None
+
+    def _take_args(self) -> Optional[Tuple[tuple, dict]]:
+        args = self._args
+        self._args = None
+        return args
+
+    def _invoke(self, invoke: Tuple[tuple, dict]) -> None:
+        args, kwargs = invoke
+        result = self._func(*args, **kwargs)
+        if not inspect.isawaitable(result):
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            asyncio.ensure_future(result)
+            return
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            if inspect.iscoroutine(result):
+                result.close()
+            raise TypeError(f'{self._func!r} returned an awaitable outside of an event loop')
+        asyncio.run_coroutine_threadsafe(_await(result), loop)
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+def debounce(func: T, wait: int, leading: bool = False, trailing: bool = True,
+             max_wait: Optional[int] = None) -> RateLimited:
+    """
+    Debounces a function: it runs once a burst of calls has been quiet for wait milliseconds.
 
     Args:
-        func (T): The function to throttle.
-        limit (int): The time limit in milliseconds.
+        func (T): The function to debounce.
+        wait (int): The quiet time in milliseconds.
+        leading (bool, optional): Also invoke on the first call of a burst. Defaults to False.
+        trailing (bool, optional): Invoke after the burst. Defaults to True.
+        max_wait (int, optional): The longest time in milliseconds an invocation may be delayed.
 
     Returns:
-        T: The throttled function.
+        RateLimited: The debounced function, with flush(), cancel() and pending().
 
     """
-    last_func = None
-    last_ran = 0
+    return RateLimited(func, wait, leading=leading, trailing=trailing, max_wait=max_wait)
 
-    def throttled_func(*args) -> None:
-        nonlocal last_func, last_ran
-        if not last_ran:
-            func(*args)
-            last_ran = time.time()
-        else:
-            if last_func:
-                last_func.cancel()
-            time_diff = time.time() - last_ran
-            if time_diff >= limit:
-                func(*args)
-                last_ran = time.time()
-            else:
-                remaining_time = limit - time_diff
-                last_func = Timer(remaining_time, func, args=args)
-                last_func.start()
 
-    return throttled_func
+def throttle(func: T, limit: int, leading: bool = True, trailing: bool = True) -> RateLimited:
+    """
+    Throttles the execution of a function based on a time limit.
+
+    The function runs at most once per limit. Calls made in between are
+    collapsed into one trailing call with the latest arguments.
 
+    Args:
+        func (T): The function to throttle.
+        limit (int): The time limit in milliseconds.
+        leading (bool, optional): Invoke on the first call of a burst. Defaults to True.
+        trailing (bool, optional): Invoke with the latest arguments at the end of the limit. Defaults to True.
+
+    Returns:
+        RateLimited: The throttled function, with flush(), cancel() and pending().
+
+    """
+    return RateLimited(func, limit, leading=leading, trailing=trailing, max_wait=limit)
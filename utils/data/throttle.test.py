@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from throttle import debounce, throttle
+
+
+class ThrottleThreadTestCase(TestCase):
+    def test_leading_and_trailing_calls(self):
+        calls = []
+        throttled = throttle(calls.append, 50)
+        for i in range(10):
+            throttled(i)
+        self.assertEqual(calls, [0])
+        time.sleep(0.15)
+        self.assertEqual(calls, [0, 9])
+
+    def test_trailing_only(self):
+        calls = []
+        throttled = throttle(calls.append, 50, leading=False)
+        throttled(1)
+        throttled(2)
+        self.assertEqual(calls, [])
+        time.sleep(0.15)
+        self.assertEqual(calls, [2])
+
+    def test_flush_and_cancel(self):
+        calls = []
+        throttled = throttle(calls.append, 1000)
+        throttled(1)
+        throttled(2)
+        throttled.flush()
+        self.assertEqual(calls, [1, 2])
+        throttled(3)
+        self.assertTrue(throttled.pending())
+        throttled.cancel()
+        self.assertFalse(throttled.pending())
+        throttled(4)
+        self.assertEqual(calls, [1, 2, 4])
+
+    def test_debounce_waits_for_quiet(self):
+        calls = []
+        debounced = debounce(calls.append, 50)
+        for i in range(5):
+            debounced(i)
+            time.sleep(0.01)
+        self.assertEqual(calls, [])
+        time.sleep(0.15)
+        self.assertEqual(calls, [4])
+
+    def test_timers_share_one_thread(self):
+        before = threading.active_count()
+        wrappers = [throttle(lambda: None, 50, leading=False) for _ in range(100)]
+        for wrapper in wrappers:
+            wrapper()
+        self.assertLessEqual(threading.active_count(), before + 1)
+        time.sleep(0.15)
+        self.assertFalse(any(wrapper.pending() for wrapper in wrappers))
+
+    def test_coroutine_functions_need_an_event_loop(self):
+        async def record(value):
+            pass
+
+        throttled = throttle(record, 20)
+        with self.assertRaises(TypeError):
+            throttled(1)
+
+
+class ThrottleAsyncioTestCase(IsolatedAsyncioTestCase):
+    async def test_trailing_call_runs_on_event_loop(self):
+        calls = []
+        loop_thread = threading.get_ident()
+        throttled = throttle(lambda value: calls.append((value, threading.get_ident())), 50)
+        throttled(1)
+        throttled(2)
+        await asyncio.sleep(0.15)
+        self.assertEqual(calls, [(1, loop_thread), (2, loop_thread)])
+
+    async def test_coroutine_functions_are_scheduled(self):
+        calls = []
+
+        async def record(value):
+            calls.append(value)
+
+        debounced = debounce(record, 20)
+        debounced(1)
+        debounced(2)
+        await asyncio.sleep(0.1)
+        self.assertEqual(calls, [2])
+
+    async def test_coroutine_functions_called_from_a_thread_run_on_the_loop(self):
+        calls = []
+
+        async def record(value):
+            calls.append((value, threading.get_ident()))
+
+        loop_thread = threading.get_ident()
+        debounced = debounce(record, 20)
+        debounced(1)
+        await asyncio.sleep(0.1)
+        await asyncio.to_thread(debounced, 2)
+        await asyncio.sleep(0.1)
+        self.assertEqual(calls, [(1, loop_thread), (2, loop_thread)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
-from typing import Any, Union
+from functools import lru_cache
+from typing import Any, Optional, Union
 from next import NextApiRequest, NextApiResponse
 from next_auth import getServerSession
 import crypto
+import os
+
+USER_HASH_CACHE_SIZE = int(os.getenv('USER_HASH_CACHE_SIZE', '10000'))
 
 def ensureHasValidSession(req: NextApiRequest, res: NextApiResponse) -> bool:
     """
@@ -18,13 +22,14 @@ def ensureHasValidSession(req: NextApiRequest, res: NextApiResponse) -> bool:
     session = await getServerSession(req, res, authOptions)
     return session is not None
 
-def getUserHash(req: NextApiRequest, res: NextApiResponse) -> str:
+def getUserHash(req: NextApiRequest, res: NextApiResponse, session: Optional[Any] = None) -> str:
     """
     Retrieves the user hash from the provided request.
 
     Args:
         req (NextApiRequest): The Next.js API request object.
         res (NextApiResponse): The Next.js API response object.
+        session (Any, optional): The already resolved session. Looked up from the request if omitted.
 
     Returns:
         str: The user hash.
@@ -33,7 +38,8 @@ def getUserHash(req: NextApiRequest, res: NextApiResponse) -> str:
         Error: If the user is unauthorized or no email is found in the session.
 
     """
-    session = await getServerSession(req, res, authOptions)
+    if session is None:
+        session = await getServerSession(req, res, authOptions)
     if not session:
         raise Error('Unauthorized')
     email = session.user.email
@@ -41,10 +47,13 @@ def getUserHash(req: NextApiRequest, res: NextApiResponse) -> str:
         raise Error('Unauthorized. No email found in session')
     return getUserHashFromMail(email)
 
+@lru_cache(maxsize=USER_HASH_CACHE_SIZE)
 def getUserHashFromMail(email: str) -> str:
     """
     Generates a hash based on the provided email.
 
+    Results are memoized, since the same few users make most requests.
+
     Args:
         email (str): The email to generate the hash from.
 
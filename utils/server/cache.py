@@ -0,0 +1,215 @@
+import copy
+import os
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+class CacheBackend(ABC):
+    """
+    Async key-value cache with per-entry TTL and hit/miss counters.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        # [loads in flight, generation] per key being loaded by cached().
+        self._loads: Dict[str, list] = {}
+
+    @abstractmethod
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Looks up a key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Tuple[bool, Any]: (True, value) on a hit, (False, None) on a miss.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float = CACHE_TTL_SECONDS):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        """
+        Removes a key, and keeps loads of it that are in flight from caching what they read.
+
+        Args:
+            key (str): The cache key.
+        """
+        load = self._loads.get(key)
+        if load is not None:
+            load[1] += 1
+        await self._delete(key)
+
+    @abstractmethod
+    async def _delete(self, key: str):
+        raise NotImplementedError
+
+    def _begin_load(self, key: str) -> int:
+        load = self._loads.setdefault(key, [0, 0])
+        load[0] += 1
+        return load[1]
+
+    def _end_load(self, key: str, generation: int) -> bool:
+        """
+        Ends a load started with _begin_load.
+
+        Returns:
+            bool: True if the key was not deleted since the load began.
+        """
+        load = self._loads[key]
+        load[0] -= 1
+        if load[0] == 0:
+            del self._loads[key]
+        return load[1] == generation
+
+    def _record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the hit/miss counters of the cache.
+
+        Returns:
+            Dict[str, Any]: The hits, misses and hit rate.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / total if total else 0.0,
+        }
+
+class LocalCache(CacheBackend):
+    """
+    In-process LRU cache with TTL expiry.
+
+    Values are copied on the way in and out so callers can never mutate a
+    cached entry. Each worker process has its own cache; use RedisCache
+    when several workers must see each other's invalidations.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+    async def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            self._record(entry is not None)
+        if entry is None:
+            return False, None
+        return True, copy.deepcopy(entry[1])
+
+    async def set(self, key, value, ttl=CACHE_TTL_SECONDS):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    async def _delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared between processes, backed by Redis.
+    """
+
+    def __init__(self, url: str = REDIS_URL):
+        super().__init__()
+        if aioredis is None:
+            raise ValueError("redis is not installed")
+        self._redis = aioredis.from_url(url)
+
+    async def get(self, key):
+        data = await self._redis.get(key)
+        self._record(data is not None)
+        if data is None:
+            return False, None
+        return True, pickle.loads(data)
+
+    async def set(self, key, value, ttl=CACHE_TTL_SECONDS):
+        await self._redis.set(key, pickle.dumps(value), px=int(ttl * 1000))
+
+    async def _delete(self, key):
+        await self._redis.delete(key)
+
+_cache: Optional[CacheBackend] = None
+
+def get_cache() -> CacheBackend:
+    """
+    Retrieves the process-wide cache selected by CACHE_BACKEND ("local" or "redis").
+
+    Returns:
+        CacheBackend: The shared cache.
+
+    Raises:
+        ValueError: If CACHE_BACKEND names an unknown backend.
+    """
+    global _cache
+    if _cache is None:
+        if CACHE_BACKEND == "local":
+            _cache = LocalCache()
+        elif CACHE_BACKEND == "redis":
+            _cache = RedisCache()
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+    return _cache
+
+async def cached(key: str, load: Callable[[], Awaitable[Any]], ttl: float = CACHE_TTL_SECONDS) -> Any:
+    """
+    Returns the cached value for a key, loading and caching it on a miss.
+
+    If the key is deleted in this process while the value loads, the value
+    may predate the change that caused the deletion, so it is returned but
+    not cached.
+
+    Args:
+        key (str): The cache key.
+        load (Callable[[], Awaitable[Any]]): Loads the value on a miss.
+        ttl (float, optional): Seconds the value stays cached. Defaults to CACHE_TTL_SECONDS.
+
+    Returns:
+        Any: The cached or freshly loaded value.
+    """
+    cache = get_cache()
+    hit, value = await cache.get(key)
+    if hit:
+        return value
+    generation = cache._begin_load(key)
+    try:
+        value = await load()
+    finally:
+        current = cache._end_load(key, generation)
+    if current:
+        await cache.set(key, value, ttl)
+    return value
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true") == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text for cache lookups: NFC form with runs of whitespace collapsed.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The normalized text.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def cache_key(model: str, text: str) -> str:
+    """
+    Builds the content-addressed key of an embedding.
+
+    Args:
+        model (str): The embedding model.
+        text (str): The embedded text.
+
+    Returns:
+        str: "<model>:<sha256 of the normalized text>".
+    """
+    return f"{model}:{hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()}"
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache backed by SQLite with least-recently-used eviction.
+
+    Vectors are stored as float32 blobs. When the stored vectors exceed
+    max_bytes, the least recently read entries are evicted.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed)")
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self._size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Looks up the embeddings of several texts.
+
+        Args:
+            model (str): The embedding model.
+            texts (List[str]): The texts to look up.
+
+        Returns:
+            List[Optional[np.ndarray]]: The cached embedding of each text, or None on a miss.
+        """
+        keys = [cache_key(model, text) for text in texts]
+        with self._lock:
+            found = {}
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._connection.executemany(
+                    "UPDATE embeddings SET accessed = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._connection.commit()
+            results = [
+                np.frombuffer(found[key], dtype=np.float32) if key in found else None
+                for key in keys
+            ]
+            hits = sum(1 for result in results if result is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: np.ndarray):
+        """
+        Stores the embeddings of several texts, evicting old entries if over the size cap.
+
+        Args:
+            model (str): The embedding model.
+            texts (List[str]): The embedded texts.
+            embeddings (np.ndarray): One embedding row per text.
+        """
+        now = time.time()
+        # Texts that normalize to the same key share one row; the last one wins, as with INSERT OR REPLACE.
+        rows = {}
+        for text, embedding in zip(texts, embeddings):
+            vector = np.asarray(embedding, dtype=np.float32).tobytes()
+            key = cache_key(model, text)
+            rows[key] = (key, vector, len(vector), now)
+        rows = list(rows.values())
+        with self._lock:
+            for key, _, size, _ in rows:
+                existing = self._connection.execute("SELECT size FROM embeddings WHERE key = ?", (key,)).fetchone()
+                self._size -= existing[0] if existing else 0
+                self._size += size
+            self._connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        while self._size > self._max_bytes:
+            oldest = self._connection.execute(
+                "SELECT key, size FROM embeddings ORDER BY accessed LIMIT 100"
+            ).fetchall()
+            if not oldest:
+                self._size = 0
+                return
+            for key, size in oldest:
+                if self._size <= self._max_bytes:
+                    break
+                self._connection.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._size -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the cache counters.
+
+        Returns:
+            Dict[str, Any]: Hits, misses, hit rate, evictions and stored bytes.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._size,
+        }
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Retrieves the process-wide embedding cache.
+
+    Returns:
+        Optional[EmbeddingCache]: The cache, or None if EMBEDDING_CACHE_ENABLED is not "true".
+    """
+    global _cache
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
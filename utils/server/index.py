@@ -1,6 +1,10 @@
+import asyncio
+import importlib.util
 import json
-from typing import List
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from io import BytesIO
+import httpx
 import requests
 from requests.exceptions import HTTPError
 from streamlit.uploaded_file_manager import UploadedFile
@@ -16,17 +20,61 @@ from .models import OpenAIModel
 from .types import Message
 from .exceptions import OpenAIError
 
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_CONCURRENT_STREAMS = int(os.getenv("OPENAI_MAX_CONCURRENT_STREAMS", "50"))
 
-def OpenAIStream(
+_http_client: Optional[httpx.AsyncClient] = None
+_stream_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared keep-alive HTTP client used for OpenAI requests.
+
+    HTTP/2 is enabled when the h2 package is installed.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(
+                OPENAI_READ_TIMEOUT,
+                connect=OPENAI_CONNECT_TIMEOUT,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """
+    Closes the shared HTTP client and its pooled connections.
+    """
+    global _http_client
+    if _http_client is not None:
+        client, _http_client = _http_client, None
+        await client.aclose()
+
+
+def _build_request(
     model: OpenAIModel,
     systemPrompt: str,
     temperature: float,
     key: str,
     messages: List[Message],
     maxTokens: int,
-):
+) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
     """
-    Generates a stream of text completions using the OpenAI API.
+    Builds the URL, headers and payload of a streaming chat completion request.
 
     Args:
         model (OpenAIModel): The OpenAI model to use.
@@ -37,11 +85,7 @@ def OpenAIStream(
         maxTokens (int): The maximum number of tokens for text completion.
 
     Returns:
-        bytes: A stream of generated text completions.
-
-    Raises:
-        HTTPError: If there is an error with the HTTP request or response.
-        OpenAIError: If the OpenAI API returns an error.
+        Tuple[str, Dict[str, str], Dict[str, Any]]: The URL, the headers and the JSON payload.
     """
     url = f"{OPENAI_API_HOST}/v1/chat/completions"
     if OPENAI_API_TYPE == "azure":
@@ -67,21 +111,111 @@ def OpenAIStream(
         "temperature": temperature,
         "stream": True,
     }
+    return url, headers, payload
+
+
+def _raise_api_error(content_type: Optional[str], text: str, cause: Optional[Exception] = None):
+    """
+    Raises the error described by an OpenAI API error response.
+
+    Args:
+        content_type (Optional[str]): The content type of the response.
+        text (str): The body of the response.
+        cause (Exception, optional): The exception to chain the raised error to.
+
+    Raises:
+        OpenAIError: If the body is a JSON OpenAI error.
+        HTTPError: Otherwise.
+    """
+    if content_type == "application/json":
+        try:
+            error = json.loads(text).get("error")
+            raise OpenAIError(
+                error["message"],
+                error["type"],
+                error["param"],
+                error["code"],
+            )
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+            raise HTTPError(f"OpenAI API returned an error: {text}") from cause
+    raise HTTPError(f"OpenAI API returned an error: {text}") from cause
+
+
+def OpenAIStream(
+    model: OpenAIModel,
+    systemPrompt: str,
+    temperature: float,
+    key: str,
+    messages: List[Message],
+    maxTokens: int,
+):
+    """
+    Generates a stream of text completions using the OpenAI API.
+
+    Args:
+        model (OpenAIModel): The OpenAI model to use.
+        systemPrompt (str): The system prompt.
+        temperature (float): The temperature value for text generation.
+        key (str): The API key to access the OpenAI API.
+        messages (List[Message]): The list of messages.
+        maxTokens (int): The maximum number of tokens for text completion.
+
+    Returns:
+        bytes: A stream of generated text completions.
+
+    Raises:
+        HTTPError: If there is an error with the HTTP request or response.
+        OpenAIError: If the OpenAI API returns an error.
+    """
+    url, headers, payload = _build_request(model, systemPrompt, temperature, key, messages, maxTokens)
+    response = requests.post(url, headers=headers, json=payload, stream=True)
     try:
-        response = requests.post(url, headers=headers, json=payload, stream=True)
         response.raise_for_status()
-        return response.iter_content(chunk_size=1024)
     except HTTPError as e:
-        if response.headers.get("content-type") == "application/json":
-            try:
-                error = response.json().get("error")
-                raise OpenAIError(
-                    error["message"],
-                    error["type"],
-                    error["param"],
-                    error["code"],
-                )
-            except (json.JSONDecodeError, KeyError):
-                raise HTTPError(f"OpenAI API returned an error: {response.text}") from e
-        else:
-            raise HTTPError(f"OpenAI API returned an error: {response.text}") from e
+        _raise_api_error(response.headers.get("content-type"), response.text, e)
+    return response.iter_content(chunk_size=1024)
+
+
+async def OpenAIStreamAsync(
+    model: OpenAIModel,
+    systemPrompt: str,
+    temperature: float,
+    key: str,
+    messages: List[Message],
+    maxTokens: int,
+) -> AsyncIterator[bytes]:
+    """
+    Streams text completions from the OpenAI API without blocking a thread.
+
+    Requests share a keep-alive connection pool (HTTP/2 where available) and
+    at most OPENAI_MAX_CONCURRENT_STREAMS completions stream at once; further
+    callers wait for a free slot.
+
+    Args:
+        model (OpenAIModel): The OpenAI model to use.
+        systemPrompt (str): The system prompt.
+        temperature (float): The temperature value for text generation.
+        key (str): The API key to access the OpenAI API.
+        messages (List[Message]): The list of messages.
+        maxTokens (int): The maximum number of tokens for text completion.
+
+    Yields:
+        bytes: Chunks of the raw server-sent event stream.
+
+    Raises:
+        HTTPError: If there is an error with the HTTP request or response.
+        OpenAIError: If the OpenAI API returns an error.
+        httpx.TimeoutException: If connecting or reading exceeds the configured timeouts.
+    """
+    global _stream_semaphore
+    if _stream_semaphore is None:
+        _stream_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENT_STREAMS)
+
+    url, headers, payload = _build_request(model, systemPrompt, temperature, key, messages, maxTokens)
+    async with _stream_semaphore:
+        async with get_http_client().stream("POST", url, headers=headers, json=payload) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                _raise_api_error(response.headers.get("content-type"), response.text)
+            async for chunk in response.aiter_bytes():
+                yield chunk
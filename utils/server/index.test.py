@@ -0,0 +1,46 @@
+import json
+import unittest
+from unittest import TestCase
+
+from requests.exceptions import HTTPError
+
+from .exceptions import OpenAIError
+from .index import _build_request, _raise_api_error
+
+
+class BuildRequestTestCase(TestCase):
+    def test_build_request(self):
+        model = {'id': 'gpt-3.5-turbo', 'name': 'gpt-3.5-turbo', 'tokenLimit': 4000, 'maxLength': 12000}
+        messages = [{'role': 'user', 'content': 'Hello'}]
+
+        url, headers, payload = _build_request(model, 'Be brief.', 0.5, 'sk-test', messages, 100)
+
+        self.assertIn('/chat/completions', url)
+        self.assertEqual(headers['Content-Type'], 'application/json')
+        self.assertIn('sk-test', headers.get('Authorization', headers.get('api-key', '')))
+        self.assertEqual(payload['messages'], [{'role': 'system', 'content': 'Be brief.'}, *messages])
+        self.assertEqual(payload['max_tokens'], 100)
+        self.assertEqual(payload['temperature'], 0.5)
+        self.assertTrue(payload['stream'])
+
+
+class RaiseApiErrorTestCase(TestCase):
+    def test_maps_json_error_body(self):
+        body = json.dumps({'error': {
+            'message': 'Rate limit reached',
+            'type': 'requests',
+            'param': None,
+            'code': 'rate_limit_exceeded',
+        }})
+        with self.assertRaises(OpenAIError):
+            _raise_api_error('application/json', body)
+
+    def test_falls_back_to_http_error(self):
+        with self.assertRaises(HTTPError):
+            _raise_api_error('text/html', '<html>Bad gateway</html>')
+        with self.assertRaises(HTTPError):
+            _raise_api_error('application/json', 'not json')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import sys
+from typing import Any, Dict, List, Tuple
+
+from utils.server.storage import StorageDriver, close_clients, get_storage
+
+# (collection, keys, options) for every index UserDb relies on.
+INDEXES: List[Tuple[str, List[Tuple[str, int]], Dict[str, Any]]] = [
+    ("conversations", [("userId", 1), ("conversation.id", 1)], {"unique": True}),
+    ("conversations", [("userId", 1), ("_id", -1)], {}),
+    ("conversations", [("userId", 1), ("updatedAt", 1)], {}),
+    ("messages", [("userId", 1), ("conversationId", 1), ("index", 1)], {"unique": True}),
+    ("folders", [("userId", 1), ("folder.id", 1)], {"unique": True}),
+    ("folders", [("userId", 1), ("folder.name", 1)], {}),
+    ("folders", [("userId", 1), ("folder.type", 1)], {}),
+    ("folders", [("userId", 1), ("updatedAt", 1)], {}),
+    ("prompts", [("userId", 1), ("prompt.id", 1)], {"unique": True}),
+    ("prompts", [("userId", 1), ("prompt.name", 1)], {}),
+    ("prompts", [("userId", 1), ("updatedAt", 1)], {}),
+    ("settings", [("userId", 1)], {"unique": True}),
+]
+
+CHECK_USER_ID = "index-self-check"
+
+# (collection, filter, sort) for the query shapes issued by UserDb.
+QUERIES: List[Tuple[str, dict, List[Tuple[str, int]]]] = [
+    ("conversations", {"userId": CHECK_USER_ID}, [("_id", -1)]),
+    ("conversations", {"userId": CHECK_USER_ID}, [("conversation.id", 1)]),
+    ("conversations", {"userId": CHECK_USER_ID, "updatedAt": {"$gt": "since"}}, [("updatedAt", 1)]),
+    ("conversations", {"userId": CHECK_USER_ID, "conversation.id": "id"}, []),
+    ("conversations", {"userId": CHECK_USER_ID, "conversation.id": {"$in": ["id"]}}, []),
+    ("messages", {"userId": CHECK_USER_ID}, [("conversationId", 1), ("index", 1)]),
+    ("messages", {"userId": CHECK_USER_ID, "conversationId": {"$in": ["id"]}}, []),
+    ("folders", {"userId": CHECK_USER_ID}, [("folder.name", 1)]),
+    ("folders", {"userId": CHECK_USER_ID, "folder.id": "id"}, []),
+    ("folders", {"userId": CHECK_USER_ID, "folder.type": "chat"}, []),
+    ("folders", {"userId": CHECK_USER_ID, "updatedAt": {"$gt": "since"}}, []),
+    ("prompts", {"userId": CHECK_USER_ID}, [("prompt.name", 1)]),
+    ("prompts", {"userId": CHECK_USER_ID, "prompt.id": "id"}, []),
+    ("prompts", {"userId": CHECK_USER_ID, "updatedAt": {"$gt": "since"}}, []),
+    ("settings", {"userId": CHECK_USER_ID}, []),
+]
+
+async def ensure_indexes(db: StorageDriver):
+    """
+    Creates the indexes UserDb relies on. Safe to run on every startup.
+
+    Args:
+        db (StorageDriver): The storage driver to create the indexes on.
+    """
+    for collection, keys, options in INDEXES:
+        await db.collection(collection).create_index(keys, **options)
+
+def _plan_stages(plan: dict) -> List[str]:
+    # Plans from the slot-based engine nest the classic plan tree under queryPlan.
+    stages = [plan["stage"]] if "stage" in plan else []
+    if "queryPlan" in plan:
+        stages += _plan_stages(plan["queryPlan"])
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+async def check_indexes(db: StorageDriver) -> List[str]:
+    """
+    Explains every UserDb query shape and reports those not served by an index.
+
+    A query is flagged when its winning plan contains a collection scan
+    (COLLSCAN) or an in-memory sort (SORT).
+
+    Args:
+        db (StorageDriver): The storage driver to check.
+
+    Returns:
+        List[str]: A description of each flagged query. Empty if all queries use indexes.
+    """
+    problems = []
+    for collection, filter, sort in QUERIES:
+        explain = await db.collection(collection).explain(filter, sort=sort)
+        stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+        flagged = [stage for stage in stages if stage in ("COLLSCAN", "SORT")]
+        if flagged:
+            problems.append(f"{collection} {filter} sort={sort}: {', '.join(flagged)}")
+    return problems
+
+async def main(argv: List[str]) -> int:
+    """
+    Creates the indexes, or with --check reports queries that do not use one.
+
+    Args:
+        argv (List[str]): The command line arguments.
+
+    Returns:
+        int: The process exit code.
+    """
+    db = get_storage()
+    try:
+        if "--check" in argv:
+            problems = await check_indexes(db)
+            for problem in problems:
+                print(f"NO INDEX: {problem}")
+            print(f"{len(QUERIES) - len(problems)}/{len(QUERIES)} queries use an index")
+            return 1 if problems else 0
+        await ensure_indexes(db)
+        print(f"Ensured {len(INDEXES)} indexes")
+        return 0
+    finally:
+        close_clients()
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
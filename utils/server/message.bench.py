@@ -0,0 +1,41 @@
+"""
+Run from the repository root: PYTHONPATH=. python -P utils/server/message.bench.py
+
+-P keeps utils/server off sys.path, where tiktoken.py would shadow the tiktoken package.
+"""
+import time
+
+from utils.server.message import count_message_tokens, create_messages_to_send, create_messages_to_send_by_serializing
+from utils.server.tiktoken import get_tiktoken_encoding, get_tiktoken_encoding_name
+
+MODEL = {
+    'id': 'gpt-4-32k',
+    'name': 'gpt-4-32k',
+    'tokenLimit': 32000,
+    'maxLength': 96000,
+}
+
+def bench(name, fn, messages, repeat=3):
+    encoding = get_tiktoken_encoding(MODEL['name'])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(encoding, MODEL, 'You are a helpful assistant.', 1000, messages)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{name}: {elapsed * 1000:.1f} ms, {len(result['messages'])} messages packed")
+    return result
+
+if __name__ == '__main__':
+    for count in (100, 500, 1000):
+        messages = [
+            {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'Message number {i}. ' * 5}
+            for i in range(count)
+        ]
+        print(f"{count} messages")
+        incremental = bench('  incremental', create_messages_to_send, messages)
+        serializing = bench('  serializing', create_messages_to_send_by_serializing, messages)
+        assert incremental == serializing
+        encoding = get_tiktoken_encoding(MODEL['name'])
+        name = get_tiktoken_encoding_name(MODEL['name'])
+        stored = [{**message, 'tokens': {name: count_message_tokens(encoding, message)}} for message in messages]
+        cached = bench('  cached counts', lambda *args: create_messages_to_send(*args, name), stored)
+        assert cached == incremental
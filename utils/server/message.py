@@ -1,17 +1,92 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from tiktoken import Tiktoken
 
+CHAT_SEPARATOR = "\n"
+# Cached token counts of a message, by encoding name. Never sent to the API.
+TOKEN_COUNTS_FIELD = "tokens"
+
 
 def create_messages_to_send(
     encoding: Tiktoken,
     model: Dict[str, Any],
     system_prompt: str,
     reserved_for_completion: int,
-    messages: List[Dict[str, str]]
+    messages: List[Dict[str, str]],
+    encoding_name: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Creates the messages to send for text completion based on the given parameters.
 
+    For chat models every message is encoded once and the token counts are
+    summed, so packing is linear in the length of the history. This gives the
+    same result as encoding the whole serialized prompt: each message is
+    framed as "role\\ncontent\\n", and under the cl100k_base pre-tokenizer used
+    by chat models a newline followed by the next role name is always a
+    token boundary. Completion models fall back to re-encoding the prompt.
+
+    Messages loaded by UserDb.get_conversation(id, with_token_counts=True)
+    carry their token counts, so with encoding_name given only messages
+    without a cached count are encoded. The counts are stripped from the
+    returned messages.
+
+    Args:
+        encoding (Tiktoken): The Tiktoken encoding instance.
+        model (Dict[str, Any]): The model information.
+        system_prompt (str): The system prompt.
+        reserved_for_completion (int): The number of tokens reserved for completion.
+        messages (List[Dict[str, str]]): The list of messages.
+        encoding_name (str, optional): The name of the encoding, to look up cached counts. Defaults to None.
+
+    Returns:
+        Dict[str, Any]: The messages to send for text completion.
+
+    """
+    if not is_chat_model(model["name"]):
+        return create_messages_to_send_by_serializing(
+            encoding, model, system_prompt, reserved_for_completion, messages
+        )
+
+    system_prompt_message = {
+        "role": "system",
+        "content": system_prompt
+    }
+    base_length = (
+        count_message_tokens(encoding, system_prompt_message)
+        + len(encoding.encode(f"assistant{CHAT_SEPARATOR}", "all"))
+    )
+
+    selected: List[Dict[str, str]] = []
+    content_length = 0
+    encoded_length = base_length
+    for i in range(len(messages) - 1, -1, -1):
+        message = messages[i]
+        encoded_length += get_message_tokens(encoding, message, encoding_name)
+        if encoded_length + reserved_for_completion > model["tokenLimit"]:
+            break
+        content_length = encoded_length
+        selected.append(strip_token_counts(message))
+
+    max_token = model["tokenLimit"] - content_length
+    return {
+        "messages": selected[::-1],
+        "maxToken": max_token
+    }
+
+
+def create_messages_to_send_by_serializing(
+    encoding: Tiktoken,
+    model: Dict[str, Any],
+    system_prompt: str,
+    reserved_for_completion: int,
+    messages: List[Dict[str, str]]
+) -> Dict[str, Any]:
+    """
+    Creates the messages to send by re-encoding the whole serialized prompt for each candidate message.
+
+    This is the reference algorithm. It is used for completion models, whose
+    prompt has no separators and therefore no guaranteed token boundaries
+    between messages.
+
     Args:
         encoding (Tiktoken): The Tiktoken encoding instance.
         model (Dict[str, Any]): The model information.
@@ -42,7 +117,7 @@ def create_messages_to_send(
         if encoded_length + reserved_for_completion > model["tokenLimit"]:
             break
         content_length = encoded_length
-        messages_to_send = [message, *messages_to_send]
+        messages_to_send = [strip_token_counts(message), *messages_to_send]
 
     max_token = model["tokenLimit"] - content_length
     return {
@@ -51,6 +126,72 @@ def create_messages_to_send(
     }
 
 
+def is_chat_model(model: str) -> bool:
+    """
+    Checks whether the model uses the chat message format.
+
+    Args:
+        model (str): The model name.
+
+    Returns:
+        bool: True for chat models, False for completion models.
+
+    """
+    return "gpt-3.5-turbo" in model or "gpt-4" in model
+
+
+def count_message_tokens(encoding: Tiktoken, message: Dict[str, str]) -> int:
+    """
+    Counts the tokens of one message framed as in a serialized chat prompt.
+
+    Args:
+        encoding (Tiktoken): The Tiktoken encoding instance.
+        message (Dict[str, str]): The message.
+
+    Returns:
+        int: The number of tokens of "role\\ncontent\\n".
+
+    """
+    framed = f"{message['role']}{CHAT_SEPARATOR}{message['content']}{CHAT_SEPARATOR}"
+    return len(encoding.encode(framed, "all"))
+
+
+def get_message_tokens(encoding: Tiktoken, message: Dict[str, Any], encoding_name: Optional[str] = None) -> int:
+    """
+    Returns the cached token count of a message, counting it if none is cached.
+
+    Args:
+        encoding (Tiktoken): The Tiktoken encoding instance.
+        message (Dict[str, Any]): The message, optionally with counts by encoding name under TOKEN_COUNTS_FIELD.
+        encoding_name (str, optional): The name of the encoding. Defaults to None, which always counts.
+
+    Returns:
+        int: The number of tokens of "role\ncontent\n".
+
+    """
+    if encoding_name is not None:
+        counts = message.get(TOKEN_COUNTS_FIELD)
+        if counts and encoding_name in counts:
+            return counts[encoding_name]
+    return count_message_tokens(encoding, message)
+
+
+def strip_token_counts(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the message without its cached token counts.
+
+    Args:
+        message (Dict[str, Any]): The message.
+
+    Returns:
+        Dict[str, Any]: The message itself if it has no counts, otherwise a copy without them.
+
+    """
+    if TOKEN_COUNTS_FIELD not in message:
+        return message
+    return {key: value for key, value in message.items() if key != TOKEN_COUNTS_FIELD}
+
+
 def serialize_messages(model: str, messages: List[Dict[str, str]]) -> str:
     """
     Serializes the messages into a string representation.
@@ -63,7 +204,8 @@ def serialize_messages(model: str, messages: List[Dict[str, str]]) -> str:
         str: The serialized messages.
 
     """
-    is_chat = "gpt-3.5-turbo" in model or "gpt-4" in model
-    msg_sep = "\n" if is_chat else ""
-    role_sep = "\n" if is_chat else ""
-    return f"{msg_sep.join([f'{message['role']}{role_sep}{message['content']}' for message in messages])}{msg_sep}assistant{role_sep}"
+    is_chat = is_chat_model(model)
+    msg_sep = CHAT_SEPARATOR if is_chat else ""
+    role_sep = CHAT_SEPARATOR if is_chat else ""
+    serialized = msg_sep.join([f"{message['role']}{role_sep}{message['content']}" for message in messages])
+    return f"{serialized}{msg_sep}assistant{role_sep}"
@@ -2,15 +2,15 @@ import unittest
 from unittest import TestCase
 from typing import List
 
-from .message import createMessagesToSend
-from .tiktoken import getTiktokenEncoding
+from .message import create_messages_to_send, create_messages_to_send_by_serializing
+from .tiktoken import get_tiktoken_encoding
 from .types import Message
 from .types.openai import OpenAIModel
 
 
 class CreateMessagesToSendTestCase(TestCase):
     def test_create_messages_to_send(self):
-        encoding = getTiktokenEncoding('gpt-3.5-turbo')
+        encoding = get_tiktoken_encoding('gpt-3.5-turbo')
         systemPrompt = 'Hello'
         model: OpenAIModel = {
             'id': 'gpt-3.5-turbo',
@@ -24,7 +24,7 @@ class CreateMessagesToSendTestCase(TestCase):
             {'role': 'user', 'content': 'Fine, thank you.'},
         ]
 
-        result = createMessagesToSend(
+        result = create_messages_to_send(
             encoding,
             model,
             systemPrompt,
@@ -35,6 +35,46 @@ class CreateMessagesToSendTestCase(TestCase):
         self.assertEqual(result['messages'][0], {'role': 'user', 'content': 'World'})
         self.assertEqual(result['maxToken'], 1066)
 
+    def test_create_messages_to_send_long_history(self):
+        encoding = get_tiktoken_encoding('gpt-3.5-turbo')
+        systemPrompt = 'You are a helpful assistant.\n'
+        model: OpenAIModel = {
+            'id': 'gpt-3.5-turbo',
+            'name': 'gpt-3.5-turbo',
+            'tokenLimit': 4000,
+            'maxLength': 12000,
+        }
+        contents = ['Hello', 'How are you?  ', 'Fine, thank you.\n\n', '```py\nprint(1)\n```', ' 123 ', '']
+        messages: List[Message] = [
+            {'role': 'user' if i % 2 == 0 else 'assistant', 'content': contents[i % len(contents)] * (i % 7)}
+            for i in range(1000)
+        ]
+
+        for reserved in (0, 100, 3990):
+            result = create_messages_to_send(encoding, model, systemPrompt, reserved, messages)
+            expected = create_messages_to_send_by_serializing(encoding, model, systemPrompt, reserved, messages)
+            self.assertEqual(result, expected)
+
+
+    def test_create_messages_to_send_uses_cached_token_counts(self):
+        encoding = get_tiktoken_encoding('gpt-3.5-turbo')
+        model: OpenAIModel = {
+            'id': 'gpt-3.5-turbo',
+            'name': 'gpt-3.5-turbo',
+            'tokenLimit': 1000,
+            'maxLength': 4000,
+        }
+        messages: List[Message] = [
+            {'role': 'user', 'content': 'Hello', 'tokens': {'cl100k_chat': 400}}
+            for _ in range(3)
+        ]
+
+        result = create_messages_to_send(encoding, model, 'Hello', 100, messages, 'cl100k_chat')
+        self.assertEqual(result['messages'], [{'role': 'user', 'content': 'Hello'}] * 2)
+
+        result = create_messages_to_send(encoding, model, 'Hello', 100, messages)
+        self.assertEqual(result['messages'], [{'role': 'user', 'content': 'Hello'}] * 3)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+LATENCY_SAMPLE_SIZE = 1000
+
+class LatencyStats:
+    """
+    Request latency counters with percentiles over the most recent samples.
+    """
+
+    def __init__(self, sample_size: int = LATENCY_SAMPLE_SIZE):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=sample_size)
+        self._outcomes = Counter()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float, outcome: Optional[str] = None):
+        """
+        Records one request.
+
+        Args:
+            elapsed_ms (float): The time the request took, in milliseconds.
+            outcome (str, optional): A label to count the request under, such as "cached".
+        """
+        with self._lock:
+            self._samples.append(elapsed_ms)
+            self.count += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            if outcome is not None:
+                self._outcomes[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the counters and the p50/p95 of the recent samples.
+
+        Returns:
+            Dict[str, Any]: The count, mean, p50, p95 and max in milliseconds, and the outcome counts.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+            outcomes = dict(self._outcomes)
+            count, total_ms, max_ms = self.count, self.total_ms, self.max_ms
+        percentile = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+        return {
+            "count": count,
+            "meanMs": total_ms / count if count else 0.0,
+            "p50Ms": percentile(0.5),
+            "p95Ms": percentile(0.95),
+            "maxMs": max_ms,
+            "outcomes": outcomes,
+        }
+
+_latency_stats: Dict[str, LatencyStats] = {}
+_latency_stats_lock = threading.Lock()
+
+def get_latency_stats(name: str) -> LatencyStats:
+    """
+    Retrieves the process-wide latency counters of a name, creating them on first use.
+
+    Args:
+        name (str): The metric name, such as "auth".
+
+    Returns:
+        LatencyStats: The shared counters.
+    """
+    with _latency_stats_lock:
+        if name not in _latency_stats:
+            _latency_stats[name] = LatencyStats()
+        return _latency_stats[name]
+
+def all_latency_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the stats of every latency metric.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The stats by metric name.
+    """
+    with _latency_stats_lock:
+        names = list(_latency_stats)
+    return {name: get_latency_stats(name).stats() for name in names}
@@ -0,0 +1,29 @@
+import asyncio
+import sys
+from typing import List
+
+from utils.server.storage import close_clients, get_storage, migrate_embedded_messages
+
+async def main(argv: List[str]) -> int:
+    """
+    Moves messages embedded in conversation documents into the messages collection.
+
+    Args:
+        argv (List[str]): The command line arguments; --batch-size=N sets the conversations migrated per batch.
+
+    Returns:
+        int: The process exit code.
+    """
+    batch_size = 100
+    for arg in argv:
+        if arg.startswith("--batch-size="):
+            batch_size = int(arg.split("=", 1)[1])
+    try:
+        migrated = await migrate_embedded_messages(get_storage(), batch_size)
+        print(f"Migrated {migrated} conversations")
+        return 0
+    finally:
+        close_clients()
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -1,7 +1,91 @@
+import asyncio
+import os
+from typing import List, Optional, Tuple
+
 import openai
 import numpy as np
 
-def create_embedding(text: str, api_key: str = None) -> np.ndarray:
+from utils.server.embedcache import get_embedding_cache
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_BATCH_MAX_CHARS = int(os.getenv("EMBEDDING_BATCH_MAX_CHARS", "100000"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+
+def batch_texts(texts: List[str], max_size: int = EMBEDDING_BATCH_SIZE,
+                max_chars: int = EMBEDDING_BATCH_MAX_CHARS) -> List[List[str]]:
+    """
+    Splits texts into consecutive batches bounded by item count and total characters.
+
+    A single text longer than max_chars gets a batch of its own.
+
+    Args:
+        texts (List[str]): The texts to split.
+        max_size (int, optional): The maximum number of texts per batch.
+        max_chars (int, optional): The maximum total characters per batch.
+
+    Returns:
+        List[List[str]]: The batches, in input order.
+
+    """
+    batches = []
+    batch = []
+    batch_chars = 0
+    for text in texts:
+        if batch and (len(batch) >= max_size or batch_chars + len(text) > max_chars):
+            batches.append(batch)
+            batch = []
+            batch_chars = 0
+        batch.append(text)
+        batch_chars += len(text)
+    if batch:
+        batches.append(batch)
+    return batches
+
+async def _request_embeddings(texts: List[str], api_key: str = None) -> np.ndarray:
+    semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+
+    async def embed(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            result = await openai.Embedding.acreate(model=EMBEDDING_MODEL, input=batch, api_key=api_key)
+        return [item["embedding"] for item in sorted(result["data"], key=lambda item: item["index"])]
+
+    batches = await asyncio.gather(*[embed(batch) for batch in batch_texts(texts)])
+    return np.array([embedding for batch in batches for embedding in batch], dtype=np.float32)
+
+async def create_embeddings(texts: List[str], api_key: str = None) -> np.ndarray:
+    """
+    Creates embeddings for several texts using batched OpenAI API requests.
+
+    Embeddings found in the embedding cache are reused; only the remaining
+    distinct texts are sent, in size-bounded batches. When there is more than
+    one batch, up to EMBEDDING_CONCURRENCY requests are in flight at once.
+
+    Args:
+        texts (List[str]): The input texts to create embeddings for.
+        api_key (str, optional): The OpenAI API key. Defaults to None.
+
+    Returns:
+        np.ndarray: A float32 matrix with one embedding row per text, in input order.
+
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    cache = get_embedding_cache()
+    if cache is None:
+        return await _request_embeddings(texts, api_key)
+
+    cached = await asyncio.to_thread(cache.get_many, EMBEDDING_MODEL, texts)
+    missing = list(dict.fromkeys(text for text, embedding in zip(texts, cached) if embedding is None))
+    if missing:
+        created = await _request_embeddings(missing, api_key)
+        await asyncio.to_thread(cache.put_many, EMBEDDING_MODEL, missing, created)
+        by_text = dict(zip(missing, created))
+        cached = [by_text[text] if embedding is None else embedding for text, embedding in zip(texts, cached)]
+    return np.array(cached, dtype=np.float32)
+
+async def create_embedding(text: str, api_key: str = None) -> np.ndarray:
     """
     Creates an embedding for the given text using the OpenAI API.
 
@@ -13,9 +97,7 @@ def create_embedding(text: str, api_key: str = None) -> np.ndarray:
         np.ndarray: The embedding of the text as a NumPy array.
 
     """
-    openai.api_key = api_key
-    result = openai.Embed.create(model="text-embedding-ada-002", inputs=text)
-    return result["data"][0]["embedding"]
+    return (await create_embeddings([text], api_key))[0]
 
 def calc_cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
     """
@@ -33,3 +115,50 @@ def calc_cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
     norm_a = np.linalg.norm(a)
     norm_b = np.linalg.norm(b)
     return dot / (norm_a * norm_b)
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Scales each row of a matrix to unit length.
+
+    Args:
+        matrix (np.ndarray): The matrix, or a single vector.
+
+    Returns:
+        np.ndarray: A float32 copy with unit-length rows; all-zero rows stay zero.
+
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
+
+def rank_by_similarity(query: np.ndarray, matrix: np.ndarray, k: Optional[int] = None,
+                       normalized: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ranks the rows of an embedding matrix by cosine similarity to a query embedding.
+
+    Scores come from a single matrix-vector product. When k is smaller than the
+    number of rows only the top k are selected (argpartition) and sorted.
+
+    Args:
+        query (np.ndarray): The query embedding.
+        matrix (np.ndarray): The embeddings to rank, one per row.
+        k (int, optional): The number of rows to return. Defaults to None for all rows.
+        normalized (bool, optional): Whether query and matrix are already unit-length float32. Defaults to False.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The row indices and their scores, most similar first.
+
+    """
+    if not normalized:
+        query = normalize_rows(query)
+        matrix = normalize_rows(matrix)
+    scores = matrix @ query
+    count = scores.shape[0]
+    if k is None or k >= count:
+        order = np.argsort(-scores, kind="stable")
+    elif k <= 0:
+        order = np.empty(0, dtype=np.intp)
+    else:
+        top = np.argpartition(-scores, k - 1)[:k]
+        order = top[np.argsort(-scores[top], kind="stable")]
+    return order, scores[order]
@@ -0,0 +1,75 @@
+import json
+import time
+
+from sse import SSEParser, iter_content_deltas
+
+CHUNK_SIZE = 1024
+
+def make_fixture(events=100_000):
+    """Builds a recorded-style chat completion stream of several MB."""
+    lines = []
+    for i in range(events):
+        chunk = {
+            'id': 'chatcmpl-bench',
+            'object': 'chat.completion.chunk',
+            'created': 1700000000,
+            'model': 'gpt-3.5-turbo',
+            'choices': [{'index': 0, 'delta': {'content': f' token{i}'}, 'finish_reason': None}],
+        }
+        lines.append(f'data: {json.dumps(chunk)}\n\n')
+    lines.append('data: [DONE]\n\n')
+    return ''.join(lines).encode('utf-8')
+
+def naive_content_deltas(chunks):
+    """Baseline: decode and re-split an accumulated string on every chunk."""
+    text = ''
+    for chunk in chunks:
+        text += chunk.decode('utf-8', errors='ignore')
+        events = text.split('\n\n')
+        text = events.pop()
+        for event in events:
+            data = event[len('data: '):]
+            if data == '[DONE]':
+                return
+            content = json.loads(data)['choices'][0]['delta'].get('content')
+            if content:
+                yield content
+
+def parser_events(chunks):
+    """Splits the stream into event data with SSEParser, without decoding the JSON."""
+    parser = SSEParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+def naive_events(chunks):
+    """Baseline: splits the stream into event data by re-splitting an accumulated string."""
+    text = ''
+    for chunk in chunks:
+        text += chunk.decode('utf-8', errors='ignore')
+        events = text.split('\n\n')
+        text = events.pop()
+        for event in events:
+            yield event[len('data: '):]
+
+def bench_events(name, fn, chunks, size):
+    start = time.perf_counter()
+    count = sum(1 for _ in fn(chunks))
+    elapsed = time.perf_counter() - start
+    print(f'{name}: {size / elapsed / 1e6:.1f} MB/s ({elapsed * 1000:.0f} ms, {count} events)')
+
+def bench(name, fn, chunks, size):
+    start = time.perf_counter()
+    text = ''.join(fn(chunks))
+    elapsed = time.perf_counter() - start
+    print(f'{name}: {size / elapsed / 1e6:.1f} MB/s ({elapsed * 1000:.0f} ms)')
+    return text
+
+if __name__ == '__main__':
+    raw = make_fixture()
+    chunks = [raw[i:i + CHUNK_SIZE] for i in range(0, len(raw), CHUNK_SIZE)]
+    print(f'{len(raw) / 1e6:.1f} MB in {len(chunks)} chunks of {CHUNK_SIZE} bytes')
+    parsed = bench('SSEParser', iter_content_deltas, chunks, len(raw))
+    naive = bench('naive split', naive_content_deltas, chunks, len(raw))
+    assert parsed == naive
+    bench_events('SSEParser events only', parser_events, chunks, len(raw))
+    bench_events('naive split events only', naive_events, chunks, len(raw))
@@ -0,0 +1,131 @@
+import json
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+DONE = b"[DONE]"
+
+_decoder = json.JSONDecoder()
+
+
+class SSEParser:
+    """
+    Incremental parser for a text/event-stream body.
+
+    Bytes are appended to a single bytearray and the last event boundary is
+    found in place, so chunk boundaries may fall anywhere, including inside a
+    line or a multi-byte character. All events completed by a chunk are
+    split out of the buffer in one pass, and the consumed prefix is dropped
+    once per chunk. Event data is returned as bytearray slices. Only the "data" field is kept; comments
+    and other fields are ignored. The line ending (LF or CRLF) is taken from
+    the first line of the stream.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scanned = 0
+        self._newline: Optional[bytes] = None
+        self._separator = b""
+
+    def feed(self, chunk: bytes) -> List[bytearray]:
+        """
+        Consumes a chunk of the stream.
+
+        Args:
+            chunk (bytes): The next bytes of the stream.
+
+        Returns:
+            List[bytearray]: The data of each event completed by this chunk, in order.
+        """
+        buffer = self._buffer
+        buffer += chunk
+        if self._newline is None:
+            first = buffer.find(b"\n")
+            if first == -1:
+                return []
+            self._newline = b"\r\n" if first > 0 and buffer[first - 1] == 0x0D else b"\n"
+            self._separator = self._newline * 2
+
+        separator = self._separator
+        end = buffer.rfind(separator, self._scanned)
+        if end == -1:
+            self._scanned = max(0, len(buffer) - len(separator) + 1)
+            return []
+        region = buffer[:end]
+        del buffer[:end + len(separator)]
+        self._scanned = 0
+
+        newline = self._newline
+        # Common case: every event is one "data: " line, so every newline in
+        # the region belongs to a separator followed by "data: ".
+        delimiter = separator + b"data: "
+        if region.startswith(b"data: ") and region.count(newline) == 2 * region.count(delimiter):
+            return region[6:].split(delimiter)
+
+        events = []
+        blocks = region.split(separator)
+        for block in blocks:
+            if block.startswith(b"data: ") and newline not in block:
+                events.append(block[6:])
+                continue
+            data = [
+                line[6:] if line[5:6] == b" " else line[5:]
+                for line in block.split(newline) if line.startswith(b"data:")
+            ]
+            if data:
+                events.append(bytearray(b"\n").join(data))
+        return events
+
+
+def parse_content_delta(data: bytes) -> Optional[str]:
+    """
+    Extracts the text delta from the data of a chat completion chunk event.
+
+    Args:
+        data (bytes): The event data.
+
+    Returns:
+        Optional[str]: The content delta, or None if the chunk carries no content.
+    """
+    choices = _decoder.decode(data.decode("utf-8")).get("choices") or []
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content") or None
+
+
+def iter_content_deltas(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Turns a raw chat completion event stream into its text deltas.
+
+    Args:
+        chunks (Iterable[bytes]): The raw stream, split at arbitrary points.
+
+    Yields:
+        str: Each non-empty content delta, until the [DONE] event.
+    """
+    parser = SSEParser()
+    for chunk in chunks:
+        for data in parser.feed(chunk):
+            if data == DONE:
+                return
+            delta = parse_content_delta(data)
+            if delta:
+                yield delta
+
+
+async def aiter_content_deltas(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Async variant of iter_content_deltas, e.g. for OpenAIStreamAsync.
+
+    Args:
+        chunks (AsyncIterable[bytes]): The raw stream, split at arbitrary points.
+
+    Yields:
+        str: Each non-empty content delta, until the [DONE] event.
+    """
+    parser = SSEParser()
+    async for chunk in chunks:
+        for data in parser.feed(chunk):
+            if data == DONE:
+                return
+            delta = parse_content_delta(data)
+            if delta:
+                yield delta
@@ -0,0 +1,40 @@
+import json
+import random
+import unittest
+from unittest import TestCase
+
+from sse import SSEParser, iter_content_deltas
+
+
+def make_stream(contents):
+    events = [json.dumps({'choices': [{'delta': {'content': content}}]}) for content in contents]
+    return (''.join(f'data: {event}\n\n' for event in events) + 'data: [DONE]\n\n').encode('utf-8')
+
+
+class SSEParserTestCase(TestCase):
+    def test_feed_returns_complete_events(self):
+        parser = SSEParser()
+        self.assertEqual(parser.feed(b'data: a\r\ndata:b\r\n\r\nda'), [b'a\nb'])
+        self.assertEqual(parser.feed(b'ta: c\r\n\r\n: comment\r\n\r\n'), [b'c'])
+
+    def test_feed_mixes_single_and_multi_line_events(self):
+        parser = SSEParser()
+        self.assertEqual(parser.feed(b'data: a\n\ndata: b\n\n'), [b'a', b'b'])
+        self.assertEqual(parser.feed(b'data: c\n\nevent: x\ndata: d\n\n\n\ndata: e\n\n'), [b'c', b'd', b'e'])
+
+    def test_content_deltas_tolerate_split_frames(self):
+        contents = [f'Hé{i}, ' for i in range(100)]
+        raw = make_stream(contents)
+        random.seed(0)
+        for _ in range(50):
+            cuts = sorted(random.sample(range(1, len(raw)), 20))
+            chunks = [raw[start:end] for start, end in zip([0, *cuts], [*cuts, len(raw)])]
+            self.assertEqual(''.join(iter_content_deltas(chunks)), ''.join(contents))
+
+    def test_content_deltas_stop_at_done(self):
+        raw = make_stream(['a']) + make_stream(['b'])
+        self.assertEqual(list(iter_content_deltas([raw])), ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
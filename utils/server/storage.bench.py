@@ -0,0 +1,49 @@
+"""
+Run from the repository root: PYTHONPATH=. python -P utils/server/storage.bench.py
+
+-P keeps utils/server off sys.path, where tiktoken.py would shadow the tiktoken package.
+"""
+import os
+import time
+from pymongo import MongoClient
+
+from utils.server.storage import MONGODB_DB, close_clients, get_db
+
+USER_ID = "bench-user"
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "500"))
+
+def list_conversations(db):
+    """Runs the same query as the conversations.list procedure."""
+    return list(db["conversations"].find({"userId": USER_ID}).sort("_id", -1))
+
+def per_request_client():
+    """Baseline: a new MongoClient for every request, as get_db() used to do."""
+    client = MongoClient(os.environ["MONGODB_URI"])
+    try:
+        return list_conversations(client[MONGODB_DB])
+    finally:
+        client.close()
+
+def pooled_client():
+    """Shared client from the process-wide registry."""
+    return list_conversations(get_db())
+
+def bench(name, fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {REQUESTS / elapsed:.1f} req/s ({elapsed * 1000 / REQUESTS:.2f} ms/req)")
+
+if __name__ == "__main__":
+    db = get_db()
+    db["conversations"].delete_many({"userId": USER_ID})
+    db["conversations"].insert_many([
+        {"userId": USER_ID, "conversation": {"id": str(i), "name": f"Conversation {i}", "messages": []}}
+        for i in range(50)
+    ])
+    bench("per-request MongoClient", per_request_client)
+    bench("pooled MongoClient", pooled_client)
+    db["conversations"].delete_many({"userId": USER_ID})
+    close_clients()
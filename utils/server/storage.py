@@ -1,8 +1,29 @@
-from pymongo import MongoClient
+from abc import ABC, abstractmethod
+from bson import ObjectId
+from bson.errors import InvalidId
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pymongo import DeleteMany, MongoClient, ReturnDocument, UpdateOne
 from pymongo.collection import Collection
 from pymongo.database import Database
-from typing import List
+from pymongo.errors import BulkWriteError, PyMongoError
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from utils.app.conversation import get_conversation_hash
+from utils.server.cache import cached, get_cache
+from utils.server.message import TOKEN_COUNTS_FIELD, count_message_tokens, strip_token_counts
+from utils.server.tiktoken import get_tiktoken_encoding, get_tiktoken_encoding_name
+import asyncio
+import atexit
+import base64
+import functools
+import itertools
 import os
+import threading
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    AsyncIOMotorClient = None
 
 MONGODB_DB = "your_mongodb_db_name"
 
@@ -16,6 +37,11 @@ class FolderInterface:
     Represents a folder interface.
     """
 
+class Message:
+    """
+    Represents a chat message.
+    """
+
 class Prompt:
     """
     Represents a prompt.
@@ -26,6 +52,108 @@ class Settings:
     Represents user settings.
     """
 
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_DRIVER = os.getenv("MONGODB_DRIVER", "motor" if AsyncIOMotorClient else "pymongo")
+MONGODB_THREAD_POOL_SIZE = int(os.getenv("MONGODB_THREAD_POOL_SIZE", "32"))
+# pymongo already splits a bulk_write into commands under maxMessageSizeBytes;
+# chunking keeps a single import from holding one huge batch in memory.
+BULK_WRITE_CHUNK_SIZE = int(os.getenv("MONGODB_BULK_WRITE_CHUNK_SIZE", "500"))
+CONVERSATION_PAGE_SIZE = 50
+CURSOR_BATCH_SIZE = int(os.getenv("MONGODB_CURSOR_BATCH_SIZE", "100"))
+# Models whose encodings get a cached token count on every stored message.
+TOKEN_COUNT_MODELS = [model for model in os.getenv("TOKEN_COUNT_MODELS", "gpt-3.5-turbo").split(",") if model]
+MAX_CONVERSATION_PAGE_SIZE = 200
+
+_clients: Dict[str, MongoClient] = {}
+_motor_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+Sort = List[Tuple[str, int]]
+
+def _get_uri() -> str:
+    if not "MONGODB_URI" in os.environ:
+        raise ValueError("MONGODB_URI is not set")
+    return os.environ["MONGODB_URI"]
+
+def _pool_options() -> Dict[str, int]:
+    return {
+        "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGODB_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    }
+
+def get_client(uri: Optional[str] = None) -> MongoClient:
+    """
+    Retrieves the process-wide MongoClient for the given URI, creating it on first use.
+
+    MongoClient is thread-safe and owns its own connection pool, so a single
+    instance is shared by every request instead of being rebuilt per call.
+
+    Args:
+        uri (str, optional): The MongoDB connection URI. Defaults to MONGODB_URI.
+
+    Returns:
+        MongoClient: The shared MongoClient instance.
+
+    Raises:
+        ValueError: If no URI is given and the MONGODB_URI environment variable is not set.
+    """
+    uri = uri or _get_uri()
+    client = _clients.get(uri)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(uri)
+        if client is None:
+            client = MongoClient(uri, **_pool_options())
+            _clients[uri] = client
+    return client
+
+def get_motor_client(uri: Optional[str] = None):
+    """
+    Retrieves the process-wide motor client for the given URI, creating it on first use.
+
+    Args:
+        uri (str, optional): The MongoDB connection URI. Defaults to MONGODB_URI.
+
+    Returns:
+        AsyncIOMotorClient: The shared motor client instance.
+
+    Raises:
+        ValueError: If motor is not installed or MONGODB_URI is not set.
+    """
+    if AsyncIOMotorClient is None:
+        raise ValueError("motor is not installed")
+
+    uri = uri or _get_uri()
+    client = _motor_clients.get(uri)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _motor_clients.get(uri)
+        if client is None:
+            client = AsyncIOMotorClient(uri, **_pool_options())
+            _motor_clients[uri] = client
+    return client
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _clients_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MONGODB_THREAD_POOL_SIZE,
+                    thread_name_prefix="pymongo",
+                )
+    return _executor
+
 def get_db() -> Database:
     """
     Retrieves the MongoDB database instance.
@@ -36,21 +164,541 @@ def get_db() -> Database:
     Raises:
         ValueError: If the MONGODB_URI environment variable is not set.
     """
-    if not "MONGODB_URI" in os.environ:
-        raise ValueError("MONGODB_URI is not set")
+    return get_client()[MONGODB_DB]
+
+def ping_db() -> bool:
+    """
+    Checks that the shared MongoDB client can reach the server.
+
+    Blocks until the server answers or the selection timeout expires, so
+    call it from a worker thread in async code.
+
+    Returns:
+        bool: True if the server answered the ping command, False otherwise,
+            including when MONGODB_URI is not set.
+    """
+    try:
+        get_client().admin.command("ping")
+        return True
+    except (PyMongoError, ValueError) as e:
+        print(f"MongoDB health check failed: {e}")
+        return False
+
+def close_clients():
+    """
+    Closes every pooled MongoClient and the pymongo thread pool. Safe to call more than once.
+    """
+    global _executor
+    with _clients_lock:
+        clients = [*_clients.values(), *_motor_clients.values()]
+        _clients.clear()
+        _motor_clients.clear()
+        executor, _executor = _executor, None
+    for client in clients:
+        client.close()
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+atexit.register(close_clients)
+
+class CollectionDriver(ABC):
+    """
+    Async interface over a single MongoDB collection used by UserDb.
+    """
+
+    @abstractmethod
+    async def find(self, filter: dict, sort: Optional[Sort] = None, projection: Optional[dict] = None,
+                   limit: int = 0) -> List[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_find(self, filter: dict, sort: Optional[Sort] = None, projection: Optional[dict] = None,
+                  batch_size: int = CURSOR_BATCH_SIZE) -> AsyncIterator[dict]:
+        """
+        Iterates over the matching documents, holding at most one cursor batch in memory.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_one(self, filter: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_one(self, filter: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_many(self, filter: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_index(self, keys: Sort, **kwargs) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def explain(self, filter: dict, sort: Optional[Sort] = None, projection: Optional[dict] = None) -> dict:
+        raise NotImplementedError
+
+class MotorCollectionDriver(CollectionDriver):
+    """
+    Collection driver backed by motor, which never blocks the event loop.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def find(self, filter, sort=None, projection=None, limit=0):
+        cursor = self._collection.find(filter, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def iter_find(self, filter, sort=None, projection=None, batch_size=CURSOR_BATCH_SIZE):
+        cursor = self._collection.find(filter, projection, batch_size=batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+        async for document in cursor:
+            yield document
+
+    async def find_one(self, filter, projection=None):
+        return await self._collection.find_one(filter, projection)
+
+    async def update_one(self, filter, update, upsert=False):
+        return await self._collection.update_one(filter, update, upsert=upsert)
+
+    async def delete_one(self, filter):
+        return await self._collection.delete_one(filter)
+
+    async def delete_many(self, filter):
+        return await self._collection.delete_many(filter)
+
+    async def find_one_and_update(self, filter, update, projection=None):
+        return await self._collection.find_one_and_update(
+            filter, update, projection=projection, return_document=ReturnDocument.AFTER
+        )
+
+    async def bulk_write(self, requests, ordered=True):
+        return await self._collection.bulk_write(requests, ordered=ordered)
+
+    async def create_index(self, keys, **kwargs):
+        return await self._collection.create_index(keys, **kwargs)
+
+    async def explain(self, filter, sort=None, projection=None):
+        cursor = self._collection.find(filter, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        return await cursor.explain()
+
+class ThreadedCollectionDriver(CollectionDriver):
+    """
+    Collection driver backed by blocking pymongo calls offloaded to a shared thread pool.
+    """
+
+    def __init__(self, collection: Collection, executor: ThreadPoolExecutor):
+        self._collection = collection
+        self._executor = executor
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def find(self, filter, sort=None, projection=None, limit=0):
+        def query():
+            cursor = self._collection.find(filter, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+        return await self._run(query)
+
+    async def iter_find(self, filter, sort=None, projection=None, batch_size=CURSOR_BATCH_SIZE):
+        cursor = self._collection.find(filter, projection, batch_size=batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            while True:
+                batch = await self._run(lambda: list(itertools.islice(cursor, batch_size)))
+                if not batch:
+                    return
+                for document in batch:
+                    yield document
+        finally:
+            cursor.close()
+
+    async def find_one(self, filter, projection=None):
+        return await self._run(self._collection.find_one, filter, projection)
+
+    async def update_one(self, filter, update, upsert=False):
+        return await self._run(self._collection.update_one, filter, update, upsert=upsert)
+
+    async def delete_one(self, filter):
+        return await self._run(self._collection.delete_one, filter)
+
+    async def delete_many(self, filter):
+        return await self._run(self._collection.delete_many, filter)
+
+    async def find_one_and_update(self, filter, update, projection=None):
+        return await self._run(
+            self._collection.find_one_and_update,
+            filter, update, projection=projection, return_document=ReturnDocument.AFTER,
+        )
+
+    async def bulk_write(self, requests, ordered=True):
+        return await self._run(self._collection.bulk_write, requests, ordered=ordered)
+
+    async def create_index(self, keys, **kwargs):
+        return await self._run(self._collection.create_index, keys, **kwargs)
+
+    async def explain(self, filter, sort=None, projection=None):
+        def query():
+            cursor = self._collection.find(filter, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            return cursor.explain()
+        return await self._run(query)
+
+class StorageDriver(ABC):
+    """
+    Hands out collection drivers for one MongoDB database.
+    """
+
+    @abstractmethod
+    def collection(self, name: str) -> CollectionDriver:
+        raise NotImplementedError
+
+class MotorStorageDriver(StorageDriver):
+    def __init__(self, db):
+        self._db = db
+
+    def collection(self, name: str) -> CollectionDriver:
+        return MotorCollectionDriver(self._db[name])
+
+class ThreadedStorageDriver(StorageDriver):
+    def __init__(self, db: Database, executor: ThreadPoolExecutor):
+        self._db = db
+        self._executor = executor
+
+    def collection(self, name: str) -> CollectionDriver:
+        return ThreadedCollectionDriver(self._db[name], self._executor)
+
+def get_storage() -> StorageDriver:
+    """
+    Retrieves the storage driver selected by MONGODB_DRIVER.
+
+    "motor" uses the native asyncio driver; "pymongo" runs the blocking driver
+    in a bounded thread pool so storage calls never stall the event loop.
+
+    Returns:
+        StorageDriver: The storage driver for the configured database.
+
+    Raises:
+        ValueError: If MONGODB_DRIVER names an unknown driver.
+    """
+    if MONGODB_DRIVER == "motor":
+        return MotorStorageDriver(get_motor_client()[MONGODB_DB])
+    if MONGODB_DRIVER == "pymongo":
+        return ThreadedStorageDriver(get_db(), _get_executor())
+    raise ValueError(f"Unknown MONGODB_DRIVER: {MONGODB_DRIVER}")
+
+def _as_dict(item) -> dict:
+    return item if isinstance(item, dict) else vars(item)
+
+def _changed_between(since: Optional[datetime], until: Optional[datetime]) -> dict:
+    if since is None and until is None:
+        return {}
+    window = {}
+    if since is not None:
+        window["$gt"] = since
+    if until is not None:
+        window["$lte"] = until
+    if since is None:
+        # Items saved before updatedAt was recorded have no such field, and
+        # belong in every export that starts from the beginning.
+        return {"$or": [{"updatedAt": window}, {"updatedAt": {"$exists": False}}]}
+    return {"updatedAt": window}
+
+def _id_order(id: Any) -> Tuple[int, Any]:
+    # MongoDB sorts numbers before strings, and imported V1 conversations can have numeric ids.
+    if isinstance(id, (int, float)) and not isinstance(id, bool):
+        return (0, id)
+    return (1, str(id))
+
+def _encode_cursor(id: ObjectId) -> str:
+    return base64.urlsafe_b64encode(id.binary).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str) -> ObjectId:
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (InvalidId, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def _split_messages(conversation: Conversation) -> Tuple[dict, list]:
+    """
+    Splits a conversation into its metadata and its messages.
+
+    Args:
+        conversation (Conversation): The conversation to split.
+
+    Returns:
+        Tuple[dict, list]: The conversation without messages, and the messages.
+    """
+    document = dict(_as_dict(conversation))
+    messages = [strip_token_counts(_as_dict(message)) for message in document.pop("messages", None) or []]
+    return document, messages
+
+def _token_counts(message: Message) -> Dict[str, int]:
+    """
+    Counts the tokens of a message for each encoding of TOKEN_COUNT_MODELS.
+
+    Encodings that cannot be loaded are skipped; the packer counts those
+    messages itself.
+
+    Args:
+        message (Message): The message.
+
+    Returns:
+        Dict[str, int]: The token counts by encoding name.
+    """
+    counts = {}
+    for model in TOKEN_COUNT_MODELS:
+        name = get_tiktoken_encoding_name(model)
+        if name in counts:
+            continue
+        try:
+            encoding = get_tiktoken_encoding(model)
+        except OSError:
+            continue
+        counts[name] = count_message_tokens(encoding, message)
+    return counts
+
+async def _count_tokens(messages: list) -> List[Dict[str, int]]:
+    """
+    Counts the tokens of several messages in a worker thread, off the event loop.
+
+    Args:
+        messages (list): The messages.
+
+    Returns:
+        List[Dict[str, int]]: The token counts by encoding name, one dict per message.
+    """
+    return await asyncio.to_thread(lambda: [_token_counts(message) for message in messages])
+
+def _with_token_counts(item: dict) -> Message:
+    if not item.get("tokens"):
+        return item["message"]
+    return {**item["message"], TOKEN_COUNTS_FIELD: item["tokens"]}
+
+async def _migrate_conversation(conversations: CollectionDriver, messages: CollectionDriver, item: dict):
+    """
+    Moves the messages embedded in one conversation document into the messages collection.
+
+    The conversation is only marked migrated if it still embeds its messages,
+    so concurrent migrations of the same conversation cannot reset a
+    messageCount that an append has already advanced.
+
+    Args:
+        conversations (CollectionDriver): The conversations collection.
+        messages (CollectionDriver): The messages collection.
+        item (dict): The conversation document, with its embedded messages.
+    """
+    user_id = item["userId"]
+    conversation_id = item["conversation"]["id"]
+    embedded = item["conversation"]["messages"] or []
+    counts = await _count_tokens(embedded)
+    requests = [
+        UpdateOne(
+            {"userId": user_id, "conversationId": conversation_id, "index": index},
+            {"$set": {
+                "message": message,
+                "hash": get_conversation_hash(message),
+                "tokens": counts[index],
+            }},
+            upsert=True,
+        )
+        for index, message in enumerate(embedded)
+    ]
+    for start in range(0, len(requests), BULK_WRITE_CHUNK_SIZE):
+        await messages.bulk_write(requests[start:start + BULK_WRITE_CHUNK_SIZE], ordered=False)
+    await conversations.update_one(
+        {"_id": item["_id"], "conversation.messages": {"$exists": True}},
+        {"$unset": {"conversation.messages": ""}, "$set": {"messageCount": len(embedded)}},
+    )
+
+async def migrate_embedded_messages(db: StorageDriver, batch_size: int = 100) -> int:
+    """
+    Moves messages embedded in conversation documents into the messages collection.
+
+    Conversations are migrated in batches and each one is marked with its
+    messageCount once its messages are written, so the migration can be
+    interrupted and re-run safely.
+    Run it with `python -m utils.server.migrate`.
 
-    client = MongoClient(os.environ["MONGODB_URI"])
-    db = client[MONGODB_DB]
-    return db
+    Args:
+        db (StorageDriver): The storage driver to migrate.
+        batch_size (int, optional): The number of conversations migrated per batch. Defaults to 100.
+
+    Returns:
+        int: The number of conversations migrated.
+    """
+    conversations = db.collection("conversations")
+    messages = db.collection("messages")
+    migrated = 0
+    while True:
+        items = await conversations.find({"conversation.messages": {"$exists": True}}, limit=batch_size)
+        if not items:
+            return migrated
+        for item in items:
+            await _migrate_conversation(conversations, messages, item)
+            migrated += 1
 
 class UserDb:
-    def __init__(self, db: Database, user_id: str):
-        self._conversations: Collection = db["conversations"]
-        self._folders: Collection = db["folders"]
-        self._prompts: Collection = db["prompts"]
-        self._settings: Collection = db["settings"]
+    def __init__(self, db: StorageDriver, user_id: str):
+        self._conversations = db.collection("conversations")
+        self._messages = db.collection("messages")
+        self._folders = db.collection("folders")
+        self._prompts = db.collection("prompts")
+        self._settings = db.collection("settings")
         self._user_id = user_id
 
+    async def _bulk_upsert(self, collection: CollectionDriver, field: str, items: list,
+                           extra: Optional[List[dict]] = None) -> List[dict]:
+        """
+        Upserts items with unordered bulk writes, one chunk at a time.
+
+        updatedAt is set from the database server's clock, so it is ordered
+        the same way for every app server.
+
+        Args:
+            collection (CollectionDriver): The collection to write to.
+            field (str): The document field holding the item, e.g. "conversation".
+            items (list): The items to upsert, matched on their id.
+            extra (List[dict], optional): Additional top-level fields to set, one dict per item.
+
+        Returns:
+            List[dict]: One {"id", "ok", "error"} result per item, in input order.
+        """
+        ids = [_as_dict(item)["id"] for item in items]
+        results = [{"id": id, "ok": True, "error": None} for id in ids]
+        for start in range(0, len(items), BULK_WRITE_CHUNK_SIZE):
+            chunk = items[start:start + BULK_WRITE_CHUNK_SIZE]
+            requests = [
+                UpdateOne(
+                    {"userId": self._user_id, f"{field}.id": ids[start + offset]},
+                    {
+                        "$set": {field: item, **(extra[start + offset] if extra else {})},
+                        "$currentDate": {"updatedAt": True},
+                    },
+                    upsert=True,
+                )
+                for offset, item in enumerate(chunk)
+            ]
+            try:
+                await collection.bulk_write(requests, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    result = results[start + error["index"]]
+                    result["ok"] = False
+                    result["error"] = error.get("errmsg")
+        return results
+
+    def _cache_key(self, name: str) -> str:
+        return f"user:{self._user_id}:{name}"
+
+    async def _invalidate(self, name: str):
+        await get_cache().delete(self._cache_key(name))
+
+    async def _sync_messages(self, conversations: List[Tuple[str, list]]) -> Dict[str, str]:
+        """
+        Brings the stored messages of several conversations in line with the given ones.
+
+        Messages are compared by content hash, so only new or edited messages
+        are written, and tokenized to cache their token counts, and messages
+        past the new end of a conversation are removed. The writes are
+        unordered, so a failed write only fails its own conversation.
+
+        Args:
+            conversations (List[Tuple[str, list]]): (conversation id, messages) pairs.
+
+        Returns:
+            Dict[str, str]: The first write error of each conversation whose messages could not all be written.
+        """
+        if not conversations:
+            return {}
+        stored = await self._messages.find(
+            {"userId": self._user_id, "conversationId": {"$in": [id for id, _ in conversations]}},
+            projection={"conversationId": 1, "index": 1, "hash": 1},
+        )
+        stored_hashes = {(item["conversationId"], item["index"]): item.get("hash") for item in stored}
+
+        changed = []
+        for conversation_id, messages in conversations:
+            for index, message in enumerate(messages):
+                message_hash = get_conversation_hash(message)
+                if stored_hashes.get((conversation_id, index)) != message_hash:
+                    changed.append((conversation_id, index, message, message_hash))
+        counts = await _count_tokens([message for _, _, message, _ in changed])
+
+        requests = [
+            UpdateOne(
+                {"userId": self._user_id, "conversationId": conversation_id, "index": index},
+                {"$set": {"message": message, "hash": message_hash, "tokens": tokens}},
+                upsert=True,
+            )
+            for (conversation_id, index, message, message_hash), tokens in zip(changed, counts)
+        ]
+        requests.extend(
+            DeleteMany(
+                {"userId": self._user_id, "conversationId": conversation_id, "index": {"$gte": len(messages)}}
+            )
+            for conversation_id, messages in conversations
+        )
+        owners = [conversation_id for conversation_id, _, _, _ in changed]
+        owners += [conversation_id for conversation_id, _ in conversations]
+
+        errors = {}
+        for start in range(0, len(requests), BULK_WRITE_CHUNK_SIZE):
+            try:
+                await self._messages.bulk_write(requests[start:start + BULK_WRITE_CHUNK_SIZE], ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    errors.setdefault(owners[start + error["index"]], error.get("errmsg"))
+        return errors
+
+    async def _backfill_token_counts(self, messages: List[dict]):
+        """
+        Counts and stores the tokens of message documents that have no token counts yet.
+
+        Args:
+            messages (List[dict]): The message documents, with their _id; updated in place.
+        """
+        missing = [message for message in messages if "tokens" not in message]
+        if not missing:
+            return
+        counts = await _count_tokens([message["message"] for message in missing])
+        for message, tokens in zip(missing, counts):
+            message["tokens"] = tokens
+        requests = [
+            UpdateOne({"_id": message["_id"], "tokens": {"$exists": False}}, {"$set": {"tokens": message["tokens"]}})
+            for message in missing
+        ]
+        for start in range(0, len(requests), BULK_WRITE_CHUNK_SIZE):
+            await self._messages.bulk_write(requests[start:start + BULK_WRITE_CHUNK_SIZE], ordered=False)
+
     @staticmethod
     async def from_user_hash(user_id: str) -> "UserDb":
         """
@@ -62,64 +710,352 @@ class UserDb:
         Returns:
             UserDb: The UserDb instance.
         """
-        db = await get_db()
-        return UserDb(db, user_id)
+        return UserDb(get_storage(), user_id)
 
     async def get_conversations(self) -> List[Conversation]:
         """
         Retrieves all conversations for the user.
 
+        Messages are read from the messages collection; conversations that
+        still embed their messages (not yet migrated) are returned as stored.
+
         Returns:
             List[Conversation]: A list of Conversation objects representing the user's conversations.
         """
-        return await self._conversations.find({"userId": self._user_id}).sort("_id", -1).toArray()
+        items = await self._conversations.find({"userId": self._user_id}, sort=[("_id", -1)])
+        messages = await self._messages.find(
+            {"userId": self._user_id},
+            sort=[("conversationId", 1), ("index", 1)],
+            projection={"conversationId": 1, "message": 1},
+        )
+        messages_by_conversation: Dict[str, list] = {}
+        for item in messages:
+            messages_by_conversation.setdefault(item["conversationId"], []).append(item["message"])
+
+        conversations = []
+        for item in items:
+            conversation = item["conversation"]
+            if "messages" not in conversation:
+                conversation["messages"] = messages_by_conversation.get(conversation["id"], [])
+            conversations.append(conversation)
+        return conversations
+
+    async def iter_conversations(self) -> AsyncIterator[Conversation]:
+        """
+        Iterates over all conversations for the user with their messages, in id order.
+
+        Conversations and messages are read from two cursors sorted by
+        conversation id and merged, so memory use does not depend on the
+        number of conversations.
+
+        Yields:
+            Conversation: Each conversation, with its messages.
+        """
+        conversations = self._conversations.iter_find({"userId": self._user_id}, sort=[("conversation.id", 1)])
+        messages = self._messages.iter_find(
+            {"userId": self._user_id},
+            sort=[("conversationId", 1), ("index", 1)],
+            projection={"conversationId": 1, "message": 1},
+        )
+        pending = await anext(messages, None)
+        async for item in conversations:
+            conversation = item["conversation"]
+            conversation_messages = []
+            key = _id_order(conversation["id"])
+            while pending is not None and _id_order(pending["conversationId"]) <= key:
+                if _id_order(pending["conversationId"]) == key:
+                    conversation_messages.append(pending["message"])
+                pending = await anext(messages, None)
+            if "messages" not in conversation:
+                conversation["messages"] = conversation_messages
+            yield conversation
+
+    async def iter_conversations_changed_since(self, since: Optional[datetime],
+                                               until: Optional[datetime] = None) -> AsyncIterator[Conversation]:
+        """
+        Iterates over the conversations saved after since and up to until, oldest change first.
+
+        Conversations are read in cursor batches; the messages of each batch
+        are fetched with one query.
+
+        Args:
+            since (datetime, optional): The exclusive lower bound of updatedAt. None for no lower bound.
+            until (datetime, optional): The inclusive upper bound of updatedAt. None for no upper bound.
+
+        Yields:
+            Conversation: Each changed conversation, with its messages.
+        """
+        batch = []
+        async for item in self._conversations.iter_find(
+            {"userId": self._user_id, **_changed_between(since, until)}, sort=[("updatedAt", 1)]
+        ):
+            batch.append(item["conversation"])
+            if len(batch) >= CURSOR_BATCH_SIZE:
+                for conversation in await self._with_messages(batch):
+                    yield conversation
+                batch = []
+        for conversation in await self._with_messages(batch):
+            yield conversation
+
+    async def _with_messages(self, conversations: List[dict]) -> List[dict]:
+        ids = [conversation["id"] for conversation in conversations if "messages" not in conversation]
+        if not ids:
+            return conversations
+        messages = await self._messages.find(
+            {"userId": self._user_id, "conversationId": {"$in": ids}},
+            sort=[("conversationId", 1), ("index", 1)],
+            projection={"conversationId": 1, "message": 1},
+        )
+        messages_by_conversation: Dict[str, list] = {}
+        for item in messages:
+            messages_by_conversation.setdefault(item["conversationId"], []).append(item["message"])
+        for conversation in conversations:
+            if "messages" not in conversation:
+                conversation["messages"] = messages_by_conversation.get(conversation["id"], [])
+        return conversations
+
+    async def get_conversation_summaries(self, limit: int = CONVERSATION_PAGE_SIZE,
+                                         cursor: Optional[str] = None) -> dict:
+        """
+        Retrieves one page of conversation summaries for the user, newest first.
+
+        Only the summary fields are read from the database; messages are not
+        loaded, so the cost of a page does not depend on conversation length.
+
+        Args:
+            limit (int, optional): The maximum number of summaries to return. Defaults to CONVERSATION_PAGE_SIZE.
+            cursor (str, optional): The nextCursor of the previous page. Defaults to None for the first page.
+
+        Returns:
+            dict: {"items": [summary, ...], "nextCursor": str or None}. Each summary holds
+                id, name, folderId, model and updatedAt.
+
+        Raises:
+            ValueError: If the cursor is not a valid cursor token.
+        """
+        limit = max(1, min(limit, MAX_CONVERSATION_PAGE_SIZE))
+        filter = {"userId": self._user_id}
+        if cursor:
+            filter["_id"] = {"$lt": _decode_cursor(cursor)}
+        items = await self._conversations.find(
+            filter,
+            sort=[("_id", -1)],
+            projection={
+                "conversation.id": 1,
+                "conversation.name": 1,
+                "conversation.folderId": 1,
+                "conversation.model": 1,
+                "updatedAt": 1,
+            },
+            limit=limit + 1,
+        )
+        next_cursor = _encode_cursor(items[limit - 1]["_id"]) if len(items) > limit else None
+        summaries = [
+            {**item["conversation"], "updatedAt": item.get("updatedAt")}
+            for item in items[:limit]
+        ]
+        return {"items": summaries, "nextCursor": next_cursor}
+
+    async def get_conversation(self, id: str, with_token_counts: bool = False) -> Optional[Conversation]:
+        """
+        Retrieves a single conversation, including its messages.
+
+        With with_token_counts, for packing with create_messages_to_send on
+        the server, each message carries its cached token counts under
+        TOKEN_COUNTS_FIELD. Messages stored before counts were cached are
+        counted here once and their counts written back.
+
+        Args:
+            id (str): The ID of the conversation.
+            with_token_counts (bool, optional): Whether to attach the token counts. Defaults to False.
+
+        Returns:
+            Optional[Conversation]: The conversation, or None if it does not exist.
+        """
+        item = await self._conversations.find_one({"userId": self._user_id, "conversation.id": id})
+        if item is None:
+            return None
+        conversation = item["conversation"]
+        if "messages" not in conversation:
+            messages = await self._messages.find(
+                {"userId": self._user_id, "conversationId": id},
+                sort=[("index", 1)],
+                projection={"message": 1, "tokens": 1} if with_token_counts else {"message": 1},
+            )
+            if with_token_counts:
+                await self._backfill_token_counts(messages)
+                conversation["messages"] = [_with_token_counts(message) for message in messages]
+            else:
+                conversation["messages"] = [message["message"] for message in messages]
+        return conversation
 
     async def save_conversation(self, conversation: Conversation):
         """
         Saves a conversation for the user.
 
+        The conversation document holds only metadata; its messages are
+        stored one document each in the messages collection. Messages are
+        written first and the content hash last, so a failed save is never
+        recorded as synced.
+
         Args:
             conversation (Conversation): The Conversation object to be saved.
+
+        Raises:
+            ValueError: If its messages could not be written.
         """
+        document, messages = _split_messages(conversation)
+        errors = await self._sync_messages([(conversation.id, messages)])
+        if errors:
+            raise ValueError(f"Could not save the messages of conversation {conversation.id}: {errors[conversation.id]}")
         await self._conversations.update_one(
             {"userId": self._user_id, "conversation.id": conversation.id},
-            {"$set": {"conversation": conversation}},
+            {
+                "$set": {
+                    "conversation": document,
+                    "hash": get_conversation_hash(conversation),
+                    "messageCount": len(messages),
+                },
+                "$currentDate": {"updatedAt": True},
+            },
+            upsert=True,
+        )
+
+    async def append_message(self, conversation_id: str, message: Message) -> int:
+        """
+        Appends a message to a conversation without rewriting earlier messages.
+
+        The message is tokenized once here to cache its token counts. A
+        conversation that still embeds its messages is migrated to the
+        messages collection first, so the new message gets the next index.
+
+        Args:
+            conversation_id (str): The ID of the conversation.
+            message (Message): The message to append.
+
+        Returns:
+            int: The index of the appended message.
+
+        Raises:
+            ValueError: If the conversation does not exist.
+        """
+        filter = {"userId": self._user_id, "conversation.id": conversation_id}
+        migrated = {**filter, "conversation.messages": {"$exists": False}}
+        update = {"$inc": {"messageCount": 1}, "$unset": {"hash": ""}, "$currentDate": {"updatedAt": True}}
+        item = await self._conversations.find_one_and_update(migrated, update, projection={"messageCount": 1})
+        if item is None:
+            embedded = await self._conversations.find_one({**filter, "conversation.messages": {"$exists": True}})
+            if embedded is None:
+                raise ValueError(f"Conversation {conversation_id} not found")
+            await _migrate_conversation(self._conversations, self._messages, embedded)
+            item = await self._conversations.find_one_and_update(migrated, update, projection={"messageCount": 1})
+        if item is None:
+            raise ValueError(f"Conversation {conversation_id} not found")
+        index = item["messageCount"] - 1
+        message = strip_token_counts(_as_dict(message))
+        [tokens] = await _count_tokens([message])
+        await self._messages.update_one(
+            {"userId": self._user_id, "conversationId": conversation_id, "index": index},
+            {"$set": {"message": message, "hash": get_conversation_hash(message), "tokens": tokens}},
             upsert=True,
         )
+        return index
 
-    async def save_conversations(self, conversations: List[Conversation]):
+    async def save_conversations(self, conversations: List[Conversation]) -> List[dict]:
         """
-        Saves multiple conversations for the user.
+        Saves multiple conversations for the user using unordered bulk writes.
+
+        Conversations whose content hash matches the stored one are skipped,
+        so only changed conversations are written. Their messages are written
+        before the conversation documents, which carry the hash, so a
+        conversation is only skipped next time once all of it was saved. A
+        conversation whose messages fail to write is reported as failed and
+        its document is left as it was.
 
         Args:
             conversations (List[Conversation]): A list of Conversation objects to be saved.
+
+        Returns:
+            List[dict]: One {"id", "ok", "error", "changed"} result per conversation, in input order.
         """
-        for conversation in conversations:
-            await self.save_conversation(conversation)
+        hashes = [get_conversation_hash(conversation) for conversation in conversations]
+        stored = await self._conversations.find(
+            {"userId": self._user_id, "conversation.id": {"$in": [c.id for c in conversations]}},
+            projection={"conversation.id": 1, "hash": 1},
+        )
+        stored_hashes = {item["conversation"]["id"]: item.get("hash") for item in stored}
+
+        changed = [
+            index for index, conversation in enumerate(conversations)
+            if stored_hashes.get(conversation.id) != hashes[index]
+        ]
+        split = [_split_messages(conversations[index]) for index in changed]
+        errors = await self._sync_messages([(document["id"], messages) for document, messages in split])
+        synced = [
+            (index, document, messages)
+            for index, (document, messages) in zip(changed, split) if document["id"] not in errors
+        ]
+        written = await self._bulk_upsert(
+            self._conversations,
+            "conversation",
+            [document for _, document, _ in synced],
+            [{"hash": hashes[index], "messageCount": len(messages)} for index, _, messages in synced],
+        )
 
-    def remove_conversation(self, id: str):
+        results = [
+            {"id": conversation.id, "ok": True, "error": None, "changed": False}
+            for conversation in conversations
+        ]
+        for index in changed:
+            error = errors.get(conversations[index].id)
+            if error is not None:
+                results[index] = {"id": conversations[index].id, "ok": False, "error": error, "changed": True}
+        for (index, _, _), result in zip(synced, written):
+            results[index] = {**result, "changed": True}
+        return results
+
+    async def remove_conversation(self, id: str):
         """
         Removes a conversation for the user by ID.
 
         Args:
             id (str): The ID of the conversation to be removed.
         """
-        self._conversations.delete_one({"userId": self._user_id, "conversation.id": id})
+        await self._conversations.delete_one({"userId": self._user_id, "conversation.id": id})
+        await self._messages.delete_many({"userId": self._user_id, "conversationId": id})
 
-    def remove_all_conversations(self):
+    async def remove_all_conversations(self):
         """
         Removes all conversations for the user.
         """
-        self._conversations.delete_many({"userId": self._user_id})
+        await self._conversations.delete_many({"userId": self._user_id})
+        await self._messages.delete_many({"userId": self._user_id})
 
     async def get_folders(self) -> List[FolderInterface]:
         """
-        Retrieves all folders for the user.
+        Retrieves all folders for the user. Served from the cache when possible.
 
         Returns:
             List[FolderInterface]: A list of FolderInterface objects representing the user's folders.
         """
-        items = await self._folders.find({"userId": self._user_id}).sort("folder.name", 1).toArray()
+        async def load():
+            items = await self._folders.find({"userId": self._user_id}, sort=[("folder.name", 1)])
+            return [item["folder"] for item in items]
+        return await cached(self._cache_key("folders"), load)
+
+    async def get_folders_changed_since(self, since: Optional[datetime],
+                                        until: Optional[datetime] = None) -> List[FolderInterface]:
+        """
+        Retrieves the folders saved after since and up to until.
+
+        Args:
+            since (datetime, optional): The exclusive lower bound of updatedAt. None for no lower bound.
+            until (datetime, optional): The inclusive upper bound of updatedAt. None for no upper bound.
+
+        Returns:
+            List[FolderInterface]: The changed folders.
+        """
+        items = await self._folders.find({"userId": self._user_id, **_changed_between(since, until)})
         return [item["folder"] for item in items]
 
     async def save_folder(self, folder: FolderInterface):
@@ -131,19 +1067,24 @@ class UserDb:
         """
         await self._folders.update_one(
             {"userId": self._user_id, "folder.id": folder.id},
-            {"$set": {"folder": folder}},
+            {"$set": {"folder": folder}, "$currentDate": {"updatedAt": True}},
             upsert=True,
         )
+        await self._invalidate("folders")
 
-    async def save_folders(self, folders: List[FolderInterface]):
+    async def save_folders(self, folders: List[FolderInterface]) -> List[dict]:
         """
-        Saves multiple folders for the user.
+        Saves multiple folders for the user using unordered bulk writes.
 
         Args:
             folders (List[FolderInterface]): A list of FolderInterface objects to be saved.
+
+        Returns:
+            List[dict]: One {"id", "ok", "error"} result per folder, in input order.
         """
-        for folder in folders:
-            await self.save_folder(folder)
+        results = await self._bulk_upsert(self._folders, "folder", folders)
+        await self._invalidate("folders")
+        return results
 
     async def remove_folder(self, id: str):
         """
@@ -153,6 +1094,7 @@ class UserDb:
             id (str): The ID of the folder to be removed.
         """
         await self._folders.delete_one({"userId": self._user_id, "folder.id": id})
+        await self._invalidate("folders")
 
     async def remove_all_folders(self, type: str):
         """
@@ -162,15 +1104,33 @@ class UserDb:
             type (str): The type of folders to be removed.
         """
         await self._folders.delete_many({"userId": self._user_id, "folder.type": type})
+        await self._invalidate("folders")
 
     async def get_prompts(self) -> List[Prompt]:
         """
-        Retrieves all prompts for the user.
+        Retrieves all prompts for the user. Served from the cache when possible.
 
         Returns:
             List[Prompt]: A list of Prompt objects representing the user's prompts.
         """
-        items = await self._prompts.find({"userId": self._user_id}).sort("prompt.name", 1).toArray()
+        async def load():
+            items = await self._prompts.find({"userId": self._user_id}, sort=[("prompt.name", 1)])
+            return [item["prompt"] for item in items]
+        return await cached(self._cache_key("prompts"), load)
+
+    async def get_prompts_changed_since(self, since: Optional[datetime],
+                                        until: Optional[datetime] = None) -> List[Prompt]:
+        """
+        Retrieves the prompts saved after since and up to until.
+
+        Args:
+            since (datetime, optional): The exclusive lower bound of updatedAt. None for no lower bound.
+            until (datetime, optional): The inclusive upper bound of updatedAt. None for no upper bound.
+
+        Returns:
+            List[Prompt]: The changed prompts.
+        """
+        items = await self._prompts.find({"userId": self._user_id, **_changed_between(since, until)})
         return [item["prompt"] for item in items]
 
     async def save_prompt(self, prompt: Prompt):
@@ -182,19 +1142,24 @@ class UserDb:
         """
         await self._prompts.update_one(
             {"userId": self._user_id, "prompt.id": prompt.id},
-            {"$set": {"prompt": prompt}},
+            {"$set": {"prompt": prompt}, "$currentDate": {"updatedAt": True}},
             upsert=True,
         )
+        await self._invalidate("prompts")
 
-    async def save_prompts(self, prompts: List[Prompt]):
+    async def save_prompts(self, prompts: List[Prompt]) -> List[dict]:
         """
-        Saves multiple prompts for the user.
+        Saves multiple prompts for the user using unordered bulk writes.
 
         Args:
             prompts (List[Prompt]): A list of Prompt objects to be saved.
+
+        Returns:
+            List[dict]: One {"id", "ok", "error"} result per prompt, in input order.
         """
-        for prompt in prompts:
-            await self.save_prompt(prompt)
+        results = await self._bulk_upsert(self._prompts, "prompt", prompts)
+        await self._invalidate("prompts")
+        return results
 
     async def remove_prompt(self, id: str):
         """
@@ -204,18 +1169,21 @@ class UserDb:
             id (str): The ID of the prompt to be removed.
         """
         await self._prompts.delete_one({"userId": self._user_id, "prompt.id": id})
+        await self._invalidate("prompts")
 
     async def get_settings(self) -> Settings:
         """
-        Retrieves the user's settings.
+        Retrieves the user's settings. Served from the cache when possible.
 
         Returns:
             Settings: The user's settings.
         """
-        item = await self._settings.find_one({"userId": self._user_id})
-        if item:
-            return item["settings"]
-        return Settings(userId=self._user_id, theme="dark", defaultTemperature=1.0)
+        async def load():
+            item = await self._settings.find_one({"userId": self._user_id})
+            if item:
+                return item["settings"]
+            return Settings(userId=self._user_id, theme="dark", defaultTemperature=1.0)
+        return await cached(self._cache_key("settings"), load)
 
     async def save_settings(self, settings: Settings):
         """
@@ -230,3 +1198,4 @@ class UserDb:
             {"$set": {"settings": settings}},
             upsert=True,
         )
+        await self._invalidate("settings")
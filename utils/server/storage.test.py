@@ -0,0 +1,40 @@
+import unittest
+from datetime import datetime, timezone
+from unittest import TestCase
+
+from .storage import _changed_between, _id_order
+
+
+class ChangedBetweenTestCase(TestCase):
+    def setUp(self):
+        self.since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.until = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+    def test_no_bounds(self):
+        self.assertEqual(_changed_between(None, None), {})
+
+    def test_full_export_includes_items_without_updated_at(self):
+        self.assertEqual(_changed_between(None, self.until), {
+            "$or": [
+                {"updatedAt": {"$lte": self.until}},
+                {"updatedAt": {"$exists": False}},
+            ],
+        })
+
+    def test_delta_export(self):
+        self.assertEqual(
+            _changed_between(self.since, self.until),
+            {"updatedAt": {"$gt": self.since, "$lte": self.until}},
+        )
+        self.assertEqual(_changed_between(self.since, None), {"updatedAt": {"$gt": self.since}})
+
+
+class IdOrderTestCase(TestCase):
+    def test_matches_mongodb_sort_order(self):
+        # MongoDB sorts numbers before strings, and strings by code point.
+        self.assertEqual(sorted(["b", 10, "10", "a", 2, 1.5], key=_id_order), [1.5, 2, 10, "10", "a", "b"])
+        self.assertEqual(_id_order(2), _id_order(2.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,22 +1,25 @@
 import os
 import json
+import threading
 import tiktoken
 
 initialized = False
 
-def get_tiktoken_encoding(model):
-    """
-    Retrieves the Tiktoken encoding for the specified model.
+# Loaded encodings by cache key. BPE ranks are read at most once per process.
+_encodings = {}
+_encodings_lock = threading.Lock()
 
-    Args:
-        model (str): The model for which to retrieve the Tiktoken encoding.
+TIKTOKEN_WARM_UP = os.getenv('TIKTOKEN_WARM_UP', 'true') == 'true'
+TIKTOKEN_WARM_UP_MODELS = ['gpt-3.5-turbo', 'text-davinci-003', 'text-embedding-ada-002']
 
-    Returns:
-        Tiktoken: The Tiktoken encoding for the specified model.
+def _encoding_key(model):
+    if 'text-davinci-' in model:
+        return 'p50k_base'
+    if 'gpt-3.5' in model or 'gpt-4' in model:
+        return 'cl100k_chat'
+    return 'cl100k_base'
 
-    Raises:
-        FileNotFoundError: If the required Tiktoken data file is not found.
-    """
+def _load_encoding(key, model):
     global initialized
 
     if not initialized:
@@ -24,14 +27,74 @@ def get_tiktoken_encoding(model):
         tiktoken.init(lambda: wasm_binary)
     initialized = True
 
-    if 'text-davinci-' in model:
-        p50k_data = json.load(open('./path/to/p50k_base.json'))
+    if key == 'p50k_base':
+        with open('./path/to/p50k_base.json') as file:
+            p50k_data = json.load(file)
         return tiktoken.Tiktoken(p50k_data['bpe_ranks'], p50k_data['special_tokens'], p50k_data['pat_str'])
-    if 'gpt-3.5' in model or 'gpt-4' in model:
+    if key == 'cl100k_chat':
         return tiktoken.encoding_for_model(model, {
             '': 100264,
             '': 100265,
             '': 100266,
         })
-    cl100k_data = json.load(open('./path/to/cl100k_base.json'))
+    with open('./path/to/cl100k_base.json') as file:
+        cl100k_data = json.load(file)
     return tiktoken.Tiktoken(cl100k_data['bpe_ranks'], cl100k_data['special_tokens'], cl100k_data['pat_str'])
+
+def get_tiktoken_encoding(model):
+    """
+    Retrieves the Tiktoken encoding for the specified model.
+
+    Encodings are created once per process and shared by all callers; the
+    first call for an encoding loads its BPE ranks under a lock.
+
+    Args:
+        model (str): The model for which to retrieve the Tiktoken encoding.
+
+    Returns:
+        Tiktoken: The Tiktoken encoding for the specified model.
+
+    Raises:
+        FileNotFoundError: If the required Tiktoken data file is not found.
+    """
+    key = _encoding_key(model)
+    encoding = _encodings.get(key)
+    if encoding is not None:
+        return encoding
+
+    with _encodings_lock:
+        encoding = _encodings.get(key)
+        if encoding is None:
+            encoding = _load_encoding(key, model)
+            _encodings[key] = encoding
+    return encoding
+
+def get_tiktoken_encoding_name(model):
+    """
+    Retrieves the name of the encoding get_tiktoken_encoding returns for a model.
+
+    Token counts cached by encoding name stay valid for every model sharing the encoding.
+
+    Args:
+        model (str): The model name.
+
+    Returns:
+        str: The encoding name, such as 'cl100k_chat'.
+    """
+    return _encoding_key(model)
+
+def warm_up_tiktoken_encodings(models=TIKTOKEN_WARM_UP_MODELS):
+    """
+    Loads the encodings for the given models so the first request does not pay for it.
+
+    Warming up is best effort: an encoding that fails to load is logged and
+    left to load, and raise, on first use, so startup is never aborted.
+
+    Args:
+        models (list, optional): The models whose encodings to load. Defaults to TIKTOKEN_WARM_UP_MODELS.
+    """
+    for model in models:
+        try:
+            get_tiktoken_encoding(model)
+        except Exception as e:
+            print(f"Tiktoken warm-up failed for {model}: {e}")
@@ -2,7 +2,7 @@ import re
 from typing import List, Optional
 from tiktoken import Tiktoken
 from readability import Document
-from similarity import calc_cosine_similarity, create_embedding
+from similarity import create_embeddings, normalize_rows, rank_by_similarity
 
 def extract_text_from_html(html: str) -> str:
     """
@@ -67,7 +67,8 @@ def chunk_text_by_token_size(encoding: Tiktoken, text: str, chunk_token_size: in
     decoded_chunks = [encoding.decode(chunk).decode() for chunk in chunks]
     return decoded_chunks
 
-async def get_similar_chunks(encoding: Tiktoken, input: str, text: str, chunk_size: int, api_key: Optional[str] = None) -> List[str]:
+async def get_similar_chunks(encoding: Tiktoken, input: str, text: str, chunk_size: int, api_key: Optional[str] = None,
+                             k: Optional[int] = None) -> List[str]:
     """
     Retrieves similar text chunks from the given input text.
 
@@ -77,28 +78,17 @@ async def get_similar_chunks(encoding: Tiktoken, input: str, text: str, chunk_si
         text (str): The target text to search for similar chunks.
         chunk_size (int): The size of each chunk in terms of tokens.
         api_key (str, optional): The API key for creating embeddings. Defaults to None.
+        k (int, optional): The number of chunks to return. Defaults to None for all chunks.
 
     Returns:
         List[str]: The list of similar text chunks, sorted by similarity score.
     """
-    input_embedding = await create_embedding(input, api_key)
     chunks = chunk_text_by_token_size(encoding, text, chunk_size)
-    chunk_embeddings = []
-    for chunk in chunks:
-        embedding = await create_embedding(chunk, api_key)
-        chunk_embeddings.append({
-            'embedding': embedding,
-            'chunk': chunk
-        })
-    chunk_similarities = []
-    for chunk_embedding in chunk_embeddings:
-        similarity = calc_cosine_similarity(input_embedding, chunk_embedding['embedding'])
-        chunk_similarities.append({
-            'similarity': similarity,
-            **chunk_embedding
-        })
-    sorted_chunks = sorted(chunk_similarities, key=lambda c: c['similarity'], reverse=True)
-    return [c['chunk'] for c in sorted_chunks]
+    if not chunks:
+        return []
+    embeddings = normalize_rows(await create_embeddings([input, *chunks], api_key))
+    order, _ = rank_by_similarity(embeddings[0], embeddings[1:], k, normalized=True)
+    return [chunks[index] for index in order]
 
 def clean_source_text(text: str) -> str:
     """